@@ -21,37 +21,78 @@ try:
 except ImportError:
     # allow toi generate docs without aims
     aims = None
+try:
+    import pandas
+except ImportError:
+    # pandas is optional, numpy.loadtxt is used instead (slower)
+    pandas = None
 import json
 import math
+import functools
+import multiprocessing
 
 osp = os.path
 
+#: number of altitude map images kept in memory by :func:`get_map_image`
+#: (read-only: use :func:`set_tile_cache_size` to change it)
+tile_cache_size = 8
+
+
+def _read_map_image(base, fname):
+    fname = osp.join(base, 'raw_images', fname)
+    print('load altitude map:', fname)
+    return aims.read(fname)
+
+
+_load_map_image = functools.lru_cache(maxsize=tile_cache_size)(
+    _read_map_image)
+
+
+def set_tile_cache_size(size):
+    '''
+    Set the number of altitude map images kept in memory by
+    :func:`get_map_image`. Images currently cached are released.
+    '''
+    global tile_cache_size, _load_map_image
+    tile_cache_size = size
+    _load_map_image = functools.lru_cache(maxsize=size)(_read_map_image)
+
 
 def get_map_image(xi, yi, meta_map, base):
     '''
     get image at coords xi, yi in the map table. Lazy load and cache it.
+
+    Images are kept in a LRU cache of ``tile_cache_size`` entries (see
+    :func:`set_tile_cache_size`), so that memory does not grow with the
+    number of tiles used.
+
+    Along with the image, its dimensions and NODATA value are also cached in
+    the metadata table entry ("sx", "sy" and "nodata" keys), so that
+    :func:`get_z` does not query the image for them on each call.
     '''
     # print(xi, yi)
     metadata = meta_map['table'][yi][xi]
     if metadata is None:
         return None
-    image = metadata.get('image')
-    if not image:
-        fname = osp.join(base, 'raw_images', metadata['file'])
-        print('load altitude map:', fname)
-        image = aims.read(fname)
-        metadata['image'] = image
+    image = _load_map_image(base, metadata['file'])
+    if 'nodata' not in metadata:
+        metadata['sx'] = image.getSizeX()
+        metadata['sy'] = image.getSizeY()
+        metadata['nodata'] = image.header()['NODATA_value']
     return image
 
 
 def get_z(x, y, meta_map, base, background_z=-99999.00):
     '''
-    get the altitude from (x, y) coords in Lambert93 coords
+    get the altitude from (x, y) coords in Lambert93 coords.
+
+    Points before the first tile (negative tile index, using floor) get the
+    background altitude, as in :func:`get_z_batch`.
     '''
     xpos = meta_map['xllcorners']
     x0 = x - xpos[0]
     cs = meta_map['cellsize']
-    xi = int(x0 / cs)
+    xi = math.floor(x0 / cs)
     if xi < 0 or xi >= len(xpos):
         return background_z
     x1 = x0 / cs - xi
@@ -59,7 +100,7 @@ def get_z(x, y, meta_map, base, background_z=-99999.00):
     ypos = meta_map['yllcorners']
     y0 = y - ypos[0]
     # cs = meta_map['cellsize']
-    yi = int(y0 / cs)
+    yi = math.floor(y0 / cs)
     if yi < 0 or yi >= len(ypos):
         return background_z
     y1 = y0 / cs - yi
@@ -68,23 +109,75 @@ def get_z(x, y, meta_map, base, background_z=-99999.00):
     if image is None:
         return background_z
 
-    x2 = int(x1 * image.getSizeX())
-    y2 = int(y1 * image.getSizeY())
+    metadata = meta_map['table'][yi][xi]
+    sy = metadata['sy']
+    x2 = int(x1 * metadata['sx'])
+    y2 = int(y1 * sy)
     # print('  ->', x2, y2)
-    z = image.at(x2, image.getSizeY() - y2 - 1)
-    if z == image.header()['NODATA_value']:
+    z = image.at(x2, sy - y2 - 1)
+    if z == metadata['nodata']:
         z = background_z
 
     return z
 
 
+def get_z_batch(xs, ys, meta_map, base, background_z=-99999.00):
+    '''
+    get the altitudes for arrays of (x, y) coords in Lambert93 coords.
+
+    This is the vectorized equivalent of :func:`get_z`: points are grouped
+    by map tile, each tile is loaded once, and all its altitudes are read in
+    a single array indexing operation.
+
+    Returns
+    -------
+    z: numpy array
+        altitudes (float32), with the same shape as xs
+    '''
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    shape = xs.shape
+    xpos = meta_map['xllcorners']
+    ypos = meta_map['yllcorners']
+    cs = meta_map['cellsize']
+    nx = len(xpos)
+    ny = len(ypos)
+    x0 = (xs.ravel() - xpos[0]) / cs
+    y0 = (ys.ravel() - ypos[0]) / cs
+    xi = np.floor(x0).astype(int)
+    yi = np.floor(y0).astype(int)
+    z = np.empty(x0.shape, dtype=np.float32)
+    z[:] = background_z
+
+    inside = np.where((xi >= 0) & (xi < nx) & (yi >= 0) & (yi < ny))[0]
+    tile_id = xi[inside] * ny + yi[inside]
+    order = np.argsort(tile_id, kind='stable')
+    inside = inside[order]
+    tile_id = tile_id[order]
+    tiles, starts = np.unique(tile_id, return_index=True)
+    ends = np.append(starts[1:], len(tile_id))
+
+    for tile, start, end in zip(tiles, starts, ends):
+        txi, tyi = divmod(int(tile), ny)
+        image = get_map_image(txi, tyi, meta_map, base)
+        if image is None:
+            continue
+        metadata = meta_map['table'][tyi][txi]
+        sx = metadata['sx']
+        sy = metadata['sy']
+        points = inside[start:end]
+        x2 = ((x0[points] - txi) * sx).astype(int)
+        y2 = ((y0[points] - tyi) * sy).astype(int)
+        tz = np.asarray(image)[x2, sy - y2 - 1, 0, 0]
+        z[points] = np.where(tz == metadata['nodata'], background_z, tz)
+
+    return z.reshape(shape)
+
+
 def convert_raw_map(fname, out_fname):
     '''
     convert one raw map from bdalti (.asc) to .ima format
     '''
-    with open(fname) as f:
-        lines = f.readlines()
-
     types = {
         'ncols': int,
         'cellsize': float,
@@ -94,35 +187,51 @@ def convert_raw_map(fname, out_fname):
     }
 
     metadata = {}
-    for l in lines[:6]:
-        item = l.strip().split()
-        k = item[0]
-        metadata[k] = types.get(k, str)(item[1])
-
+    with open(fname) as f:
+        for i in range(6):
+            item = f.readline().strip().split()
+            k = item[0]
+            metadata[k] = types.get(k, str)(item[1])
     # print(metadata)
+
+    if pandas is not None:
+        data = pandas.read_csv(fname, sep=r'\s+', skiprows=6, header=None,
+                               dtype=np.float32, engine='c',
+                               memory_map=True).to_numpy()
+    else:
+        data = np.loadtxt(fname, dtype=np.float32, skiprows=6, ndmin=2)
+
     image = aims.Volume((int(metadata['ncols']), int(metadata['nrows'])),
                         dtype='float')
     array = np.asarray(image)
-    for i, l in enumerate(lines[6:]):
-        array[:, i, 0, 0] = [float(x) for x in l.strip().split()]
+    array[:, :, 0, 0] = data.T
 
     image.header().update(metadata)
     aims.write(image, out_fname)
 
 
-def convert_raw_maps(fnames, out_fnames):
+def _convert_raw_map_args(args):
+    return convert_raw_map(*args)
+
+
+def convert_raw_maps(fnames, out_fnames, nproc=None):
     '''
     convert all raw data files from bdalti (.asc) to .ima format
 
+    Files are independent, and are converted in parallel.
+
     fnames:
         input files pattern (used with glob.glob())
     out_fnames:
         output files pattern, should contain a "%s" pattern
+    nproc:
+        number of processes. Default: number of CPUs
     '''
-    for fname in glob.glob(fnames):
-        bname = osp.basename(fname)
-        out_fname = out_fnames % bname.split('.')[0]
-        convert_raw_map(fname, out_fname)
+    jobs = [(fname, out_fnames % osp.basename(fname).split('.')[0])
+            for fname in glob.glob(fnames)]
+    with multiprocessing.Pool(processes=nproc) as pool:
+        for _ in pool.imap_unordered(_convert_raw_map_args, jobs):
+            pass
 
 
 def build_meta_table(ima_fnames):
@@ -2,11 +2,20 @@
 
 from __future__ import print_function
 
-from soma import aims
+try:
+    from soma import aims
+except ImportError:
+    # allow to use the palette functions without aims
+    aims = None
 import numpy as np
 import glob
 import os
 import json
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional: the numpy implementation is used without it
+    njit = None
 
 
 def get_scale(img, divisions=21, x_shift=-5):
@@ -29,151 +38,212 @@ def scale_image(img):
         return scale_image_rgb(img)
 
 
+def _color_array(img):
+    '''
+    numpy view on the color components of a RGB or HSV volume, as an array
+    of shape (X, Y, Z, T, 3). Modifying it modifies the volume.
+    '''
+    arr = np.asarray(img)
+    if arr.dtype.names:
+        # structured array (field 'v' holds the components)
+        arr = arr['v']
+    return arr
+
+
 def scale_image_rgb(img):
-    for y in range(img.getSize()[1]):
-        for x in range(img.getSize()[0]):
-            rgb = img.at(x, y)
-            intens = np.sqrt(rgb[0]*rgb[0] + rgb[1]*rgb[1] + rgb[2]*rgb[2])
-            if intens == 0:
-                img.setValue([0, 0, 0], x, y)
-            else:
-                scl = float( 128. / intens )
-                img.setValue(aims.AimsRGB(int(rgb[0] * scl),
-                                          int(rgb[1] * scl),
-                                          int(rgb[2] * scl)), x, y)
+    arr = _color_array(img)
+    intens = np.sqrt(np.sum(arr.astype(np.float32) ** 2, axis=-1))
+    scl = np.zeros(intens.shape, dtype=np.float32)
+    np.divide(128., intens, out=scl, where=intens != 0)
+    arr[:] = np.clip(arr * scl[..., np.newaxis], 0, 255).astype(arr.dtype)
 
 
 def scale_image_hsv(img):
-    for y in range(img.getSize()[1]):
-        for x in range(img.getSize()[0]):
-            hsv = aims.AimsHSV(img.at(x, y))
-            #if hsv[1] < 10 or hsv[0] > 200:
-            hsv[2] = 255
-            if hsv[0] > 200:
-                hsv[0] = 0
-            if hsv[1] < 10:
-                hsv[0] = 0
-            if hsv[0] > 10:
-                hsv[1] = 255
+    arr = _color_array(img)
+    h = arr[..., 0]
+    s = arr[..., 1]
+    arr[..., 2] = 255
+    h[(h > 200) | (s < 10)] = 0
+    scl = h.astype(float) / 10.
+    s[:] = np.where(
+        h > 10, 255,
+        np.round((100. + s * 155. / 255.) * (1. - scl) + 255. * scl))
+
+
+def interpolate_palette(colors, src_scl, dst_scl):
+    '''
+    Interpolate altitudes for an array of colors of shape (..., 3): each
+    color is projected on the segment joining its nearest palette color in
+    dst_scl and the closest of its two neighbours, and the altitude is
+    linearly interpolated between the matching values in src_scl.
+
+    Returns an array of altitudes of shape colors.shape[:-1].
+    '''
+    colors = np.asarray(colors, dtype=np.float32)
+    src_scl = np.asarray(src_scl, dtype=float)
+    dst_scl = np.asarray(dst_scl, dtype=np.float32)
+    n = dst_scl.shape[0]
+    # squared distances to all palette colors, shape (..., n). Accumulate
+    # channel by channel to avoid a (..., n, 3) temporary.
+    dist = np.zeros(colors.shape[:-1] + (n, ), dtype=np.float32)
+    for c in range(colors.shape[-1]):
+        dist += (colors[..., c, np.newaxis] - dst_scl[:, c]) ** 2
+    dmin = np.argmin(dist, axis=-1)
+    dprev = np.take_along_axis(
+        dist, np.maximum(dmin - 1, 0)[..., np.newaxis], axis=-1)[..., 0]
+    dnext = np.take_along_axis(
+        dist, np.minimum(dmin + 1, n - 1)[..., np.newaxis], axis=-1)[..., 0]
+    use_prev = (dmin == n - 1) | ((dmin != 0) & (dprev < dnext))
+    i0 = np.where(use_prev, dmin - 1, dmin)
+    i1 = i0 + 1
+    # project
+    axis = dst_scl[i1] - dst_scl[i0]
+    d2 = np.sum(axis ** 2, axis=-1)
+    x = np.sum((colors - dst_scl[i0]) * axis, axis=-1) \
+        / np.where(d2 == 0, 1., d2)
+    x = np.clip(x, 0., 1.)
+    alt = src_scl[i0] + (src_scl[i1] - src_scl[i0]) * x
+    alt[d2 == 0] = src_scl[-1]
+    return alt
+
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True)
+    def _interpolate_palette_kernel(colors, src_scl, dst_scl, out):
+        '''
+        Numba version of interpolate_palette() on a flat (N, 3) colors
+        array. Does not allocate any distances array: only the distances to
+        the closest palette color neighbours are kept, as scalars.
+        '''
+        n = dst_scl.shape[0]
+        nc = colors.shape[1]
+        for p in prange(colors.shape[0]):
+            dmin_val = np.inf
+            dmin = 0
+            d_last = np.inf  # distance to color i - 1
+            d_before = np.inf  # distance to color dmin - 1
+            d_after = np.inf  # distance to color dmin + 1
+            for i in range(n):
+                d = 0.
+                for c in range(nc):
+                    d += (colors[p, c] - dst_scl[i, c]) ** 2
+                if d < dmin_val:
+                    dmin_val = d
+                    dmin = i
+                    d_before = d_last
+                elif i == dmin + 1:
+                    d_after = d
+                d_last = d
+            if dmin == 0:
+                i0 = 0
+            elif dmin == n - 1 or d_before < d_after:
+                i0 = dmin - 1
+            else:
+                i0 = dmin
+            i1 = i0 + 1
+            d2 = 0.
+            x = 0.
+            for c in range(nc):
+                a = dst_scl[i1, c] - dst_scl[i0, c]
+                d2 += a * a
+                x += (colors[p, c] - dst_scl[i0, c]) * a
+            if d2 == 0:
+                out[p] = src_scl[-1]
             else:
-                scl = float(hsv[0]) / 10.
-                hsv[1] = int(round((100. + hsv[1] * 155. / 255.) * (1. - scl) + 255. * scl))
-            img.setValue(hsv, x, y)
+                x = min(max(x / d2, 0.), 1.)
+                out[p] = src_scl[i0] + (src_scl[i1] - src_scl[i0]) * x
 
+else:
+    _interpolate_palette_kernel = None
 
-def get_float_altitude(img, src_scl, dst_scl):
-    def interpolate(rgb, src_scl, dst_scl):
-        rgb = np.asarray(rgb).astype(float)
-        #if rgb[1] < 10 or rgb[0] > 200:
-        #if rgb[0] > 200:
-            #rgb[0] = 0.
-        #rgb[0] *= 2.
-        #rgb[1] = 255.
-        #rgb[2] = 255.
-        dist = np.sum((dst_scl - rgb) ** 2, axis=1)
-        #dist = ((dst_scl - rgb) ** 2)[:, 0]
-        #print('dist:', dist)
-        dmin = np.argmin(dist)
-        if dmin == 0:
-            ind = [dmin, dmin + 1]
-        elif dmin == dst_scl.shape[0] - 1:
-            ind = [dmin - 1, dmin]
-        else:
-            if dist[dmin - 1] < dist[dmin + 1]:
-                ind = [dmin - 1, dmin]
-            else:
-                ind = [dmin, dmin + 1]
-        # project
-        axis = dst_scl[ind[1]] - dst_scl[ind[0]]
-        d2 = np.sum(axis ** 2)
-        if d2 == 0:
-            return src_scl[-1]
-        else:
-            x = (rgb - dst_scl[ind[0]]).dot(axis) / d2
-        if x < 0:
-            x = 0.
-        elif x > 1:
-            x = 1.
-        return src_scl[ind[0]] + (src_scl[ind[1]] - src_scl[ind[0]]) * x
 
-    dst_scl = np.asarray(scl_map).astype(float)
-    #dst_scl[:, 0] *= 2.
-    #dst_scl[:, 1] = 255.
+def get_float_altitude(img, src_scl, dst_scl):
     new_img = aims.Volume(img.getSize(), dtype='FLOAT')
     new_img.header()['voxel_size'] = img.header()['voxel_size']
-    for y in range(img.getSize()[1]):
-        for x in range(img.getSize()[0]):
-            rgb = img.at(x, y)
-            alt = interpolate(rgb, src_scl, dst_scl)
-            new_img.setValue(alt, x, y)
+    colors = _color_array(img)
+    # maps use few distinct colors: interpolate each of them only once
+    colors, inverse = np.unique(colors.reshape(-1, colors.shape[-1]), axis=0,
+                                return_inverse=True)
+    if _interpolate_palette_kernel is not None:
+        alt = np.zeros(colors.shape[0])
+        _interpolate_palette_kernel(
+            colors.astype(float), np.asarray(src_scl, dtype=float),
+            np.asarray(dst_scl, dtype=float), alt)
+    else:
+        alt = interpolate_palette(colors, src_scl, dst_scl)
+    np.asarray(new_img)[:] = alt[inverse.ravel()].reshape(
+        np.asarray(new_img).shape)
     return new_img
 
 
-images = sorted(glob.glob('altitude/raw/*.jpg'))
-if not os.path.exists('altitude/intens'):
-    os.mkdir('altitude/intens')
-if not os.path.exists('altitude/real'):
-    os.mkdir('altitude/real')
-
-scales = {}
-scl_min = 1000
-scl_max = -10
-
-print('read scales')
-for image in images:
-    src_scl = image.replace('.jpg', '.json')
-    if os.path.exists(src_scl):
-        scale = json.load(open(src_scl))['altitudes']
-        scales[image] = scale
-        m = min(scale)
-        if m < scl_min:
-            scl_min = m
-        m = max(scale)
-        if m > scl_max:
-            scl_max = m
-
-print('global min/max:', scl_min, '/', scl_max)
-glob_scale = {'scale_min': scl_min, 'scale_max': scl_max}
-json.dump(glob_scale, open('altitude/real/global.json', 'w'))
-
-for image in images:
-    print('read:', image)
-    img_rgb = aims.read(image)
-    ## scale in RGB space
-    #scale_image(img_rgb)
-    out_img = image.replace('/raw/', '/intens/')
-    #print('write:', out_img)
-    #aims.write(img_rgb, out_img)
-    # re-scale in HSV space
-    c = aims.Converter_Volume_RGB_Volume_HSV()
-    img = c(img_rgb)
-    scale_image(img)
-
-    # go back to RGB
-    #c = aims.Converter_Volume_HSV_Volume_RGB()
-    #img = c(img)
-
-    out_img = out_img.replace('.jpg', '.ima')
-    print('write:', out_img)
-    aims.write(img, out_img)
-    scl_map = get_scale(img)
-    json_d = {'scale_map': [list(x) for x in scl_map]}
-    out_img_json = out_img.replace('.ima', '.json')
-    json.dump(json_d, open(out_img_json, 'w'))
-
-    scale = scales.get(image)
-    if scale is not None:
-        print('build real alt')
+if __name__ == '__main__':
+
+    images = sorted(glob.glob('altitude/raw/*.jpg'))
+    if not os.path.exists('altitude/intens'):
+        os.mkdir('altitude/intens')
+    if not os.path.exists('altitude/real'):
+        os.mkdir('altitude/real')
+
+    scales = {}
+    scl_min = 1000
+    scl_max = -10
+
+    print('read scales')
+    for image in images:
+        src_scl = image.replace('.jpg', '.json')
+        if os.path.exists(src_scl):
+            scale = json.load(open(src_scl))['altitudes']
+            scales[image] = scale
+            m = min(scale)
+            if m < scl_min:
+                scl_min = m
+            m = max(scale)
+            if m > scl_max:
+                scl_max = m
+
+    print('global min/max:', scl_min, '/', scl_max)
+    glob_scale = {'scale_min': scl_min, 'scale_max': scl_max}
+    json.dump(glob_scale, open('altitude/real/global.json', 'w'))
+
+    for image in images:
+        print('read:', image)
+        img_rgb = aims.read(image)
+        ## scale in RGB space
+        #scale_image(img_rgb)
+        out_img = image.replace('/raw/', '/intens/')
+        #print('write:', out_img)
+        #aims.write(img_rgb, out_img)
+        # re-scale in HSV space
+        c = aims.Converter_Volume_RGB_Volume_HSV()
+        img = c(img_rgb)
+        scale_image(img)
+
+        # go back to RGB
         #c = aims.Converter_Volume_HSV_Volume_RGB()
-        flt_alt = get_float_altitude(img, scale, scl_map)
-        out_flt_alt_file = image.replace('/raw/', '/real/').replace(
-            '.jpg', '.ima')
-        print('write:', out_flt_alt_file)
-        aims.write(flt_alt, out_flt_alt_file)
-        # write as jpeg
-        flt_alt = (flt_alt - scl_min) * 255.49 / (scl_max - scl_min)
-        c = aims.Converter_Volume_FLOAT_Volume_U16()
-        u16_alt = c(flt_alt)
-        out_u16_alt_file = out_flt_alt_file.replace('.ima', '.jpg')
-        print('write:', out_u16_alt_file)
-        aims.write(u16_alt, out_u16_alt_file, format='JPG')
+        #img = c(img)
+
+        out_img = out_img.replace('.jpg', '.ima')
+        print('write:', out_img)
+        aims.write(img, out_img)
+        scl_map = get_scale(img)
+        json_d = {'scale_map': [list(x) for x in scl_map]}
+        out_img_json = out_img.replace('.ima', '.json')
+        json.dump(json_d, open(out_img_json, 'w'))
+
+        scale = scales.get(image)
+        if scale is not None:
+            print('build real alt')
+            #c = aims.Converter_Volume_HSV_Volume_RGB()
+            flt_alt = get_float_altitude(img, scale, scl_map)
+            out_flt_alt_file = image.replace('/raw/', '/real/').replace(
+                '.jpg', '.ima')
+            print('write:', out_flt_alt_file)
+            aims.write(flt_alt, out_flt_alt_file)
+            # write as jpeg
+            flt_alt = (flt_alt - scl_min) * 255.49 / (scl_max - scl_min)
+            c = aims.Converter_Volume_FLOAT_Volume_U16()
+            u16_alt = c(flt_alt)
+            out_u16_alt_file = out_flt_alt_file.replace('.ima', '.jpg')
+            print('write:', out_u16_alt_file)
+            aims.write(u16_alt, out_u16_alt_file, format='JPG')
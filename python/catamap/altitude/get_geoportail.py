@@ -9,7 +9,8 @@ Conversion tools for Geoportail altitude maps.
 We have shifted to BDalti, see :mod:`catamap.altitude.bdalti`.
 '''
 
-import urllib2
+from urllib.request import urlopen
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 url = 'https://wxs.ign.fr/%(key)s/geoportail/wmts?SERVICE=WMTS&REQUEST=GetTile&VERSION=1.0.0&LAYER=%(layer)s&TILEMATRIXSET=PM&TILEMATRIX=%(level)s&TILECOL=%(col)s&TILEROW=%(row)s&STYLE=normal&FORMAT=image/jpeg'
@@ -36,6 +37,26 @@ level = alt_level
 col0 = init_col * 2**(alt_level - init_level)
 row0 = init_row * 2**(alt_level - init_level)
 
+max_workers = 16
+
+
+def get_tile(vars):
+    filename = os.path.join(alt_dir, 'alt_%(col)s_%(row)s.jpg' % vars)
+    if os.path.exists(filename):
+        # already downloaded
+        return
+    print('get image', vars['level'], vars['col'], vars['row'])
+    print('url:', url % vars)
+    # download to a temporary file, so that an interrupted download does
+    # not leave a truncated tile looking already done
+    tmp_filename = filename + '.part'
+    with urlopen(url % vars) as content:
+        with open(tmp_filename, 'wb') as f:
+            f.write(content.read())
+    os.replace(tmp_filename, filename)
+
+
+tiles = []
 for row in range(heigth):
     r = row + row0
     for col in range(width):
@@ -47,12 +68,8 @@ for row in range(heigth):
             'row': r,
             'col': c,
         }
-        print('get image', level, c, r)
-        print('url:', url % vars)
-        content = urllib2.urlopen(url % vars)
-        print(type(content))
-        filename = os.path.join(alt_dir, 'alt_%(col)s_%(row)s.jpg' % vars)
-        with open(filename, 'wb') as f:
-            f.write(content.read())
-
+        tiles.append(vars)
 
+# downloads are network-bound: run them concurrently
+with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    list(executor.map(get_tile, tiles))
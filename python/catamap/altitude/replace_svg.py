@@ -1,27 +1,47 @@
 #!/usr/bin/env python
 
-import xml.etree.cElementTree as ET
+try:
+    from lxml import etree as ET
+    # embedded images may exceed the default libxml2 size limits
+    iterparse_kw = {'huge_tree': True}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    iterparse_kw = {}
 
 svg_filename = 'altitude/raw/assemblage.svg'
 out_filaname = svg_filename.replace('/raw/', '/real/')
 
-xml = ET.parse(svg_filename)
+props = ('{http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd}absref', 'sodipodi:absref')
 
-root = xml.getroot()
-layer = [l for l in root if l.tag.endswith('}g')][0]
-props = ['{http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd}absref', 'sodipodi:absref']
-todo = list(layer[:])
-while todo:
-    item = todo.pop(0)
-    if item.tag.endswith('}g'):
-        todo += item[:]
+# patch images of the first layer while parsing, instead of parsing the
+# whole file, then walking the tree again.
+# traverse holds, for each currently open element, whether its children are
+# to be processed: true for the first layer and the groups inside it.
+root = None
+layer_found = False
+traverse = []
+for event, item in ET.iterparse(svg_filename, events=('start', 'end'),
+                                 **iterparse_kw):
+    if event == 'start':
+        if root is None:
+            root = item
+            traverse.append(False)
+        elif len(traverse) == 1 and not layer_found \
+                and item.tag.endswith('}g'):
+            layer_found = True
+            traverse.append(True)
+        else:
+            traverse.append(traverse[-1] and item.tag.endswith('}g'))
         continue
-    if item.tag.endswith('image'):
+    traverse.pop()
+    if traverse and traverse[-1] and item.tag.endswith('image'):
+        attrib = item.attrib
         for prop in props:
-            fname = item.get(prop)
+            fname = attrib.get(prop)
             if fname is not None:
                 nname = fname.replace('/raw/', '/real/')
                 item.set(prop, nname)
 
-xml.write(out_filaname)
+ET.ElementTree(root).write(out_filaname, xml_declaration=True,
+                           encoding='utf-8')
 
@@ -7,7 +7,8 @@ diff_svg module
 
 Print differences between two SVG maps.
 
-Uses the yaml module (``pip install pyyaml``).
+Uses the yaml module (``pip install pyyaml``). The lxml module is used, if
+available, for faster parsing.
 
 The output is a hierarchical dictionary of differences between the two maps. Differences in tags (properties) and children are recorded. Item keys are their "id" property, which should be unique in the files, and are displayed hierarchically.
 
@@ -23,7 +24,14 @@ diff_svg module API
 -------------------
 '''
 
-import xml.etree.cElementTree as ET
+try:
+    from lxml import etree as ET
+    # embedded images may exceed the default libxml2 size limits, and we do
+    # not need the ID index
+    xml_parser = ET.XMLParser(huge_tree=True, collect_ids=False)
+except ImportError:
+    import xml.etree.ElementTree as ET
+    xml_parser = None
 import sys
 import yaml
 import argparse
@@ -31,39 +39,60 @@ import argparse
 size_limit = 1000
 
 
-def diff_element(el1, el2, verbose_depth=0, verbose_depth_max=1):
+def short_value(value):
+    '''
+    Replace values larger than size_limit with a short description
+    '''
+    if len(value) > size_limit:
+        return '<value too large, size: %d>' % len(value)
+    return value
+
+
+def children_by_id(el):
+    '''
+    Index the children of an XML element by their "id" property. If several
+    children share the same id, the first one is kept.
+    '''
+    index = {}
+    for child in el:
+        index.setdefault(child.get('id'), child)
+    return index
+
+
+def diff_element(el1, el2, verbose_depth=0, verbose_depth_max=1,
+                 release=False):
 
     '''
     Compare two SVG XML trees, record differences in both properties and
     children in a readable dictionary.
+
+    If release is True, children subtrees are cleared once they have been
+    compared, in order to free memory as the comparison goes. The input trees
+    are thus emptied.
     '''
 
     diff_d = {}
-    ch1 = set([child.get('id') for child in el1])
-    ch2 = set([child.get('id') for child in el2])
-
-    # properties (tags)9536d8a6740e0ae758e20faad947a7ca14500354
-    if el1.items() != el2.items():
-        keys1 = set(el1.keys())
-        keys2 = set(el2.keys())
-        only_k1 = keys1.difference(keys2)
-        only_k2 = keys2.difference(keys1)
-        inter_k = keys1.intersection(keys2)
+    idx1 = children_by_id(el1)
+    idx2 = children_by_id(el2)
+    ch1 = idx1.keys()
+    ch2 = idx2.keys()
+
+    # properties (tags)
+    a1 = dict(el1.attrib)
+    a2 = dict(el2.attrib)
+    if a1 != a2:
+        keys1 = a1.keys()
+        keys2 = a2.keys()
+        only_k1 = keys1 - keys2
+        only_k2 = keys2 - keys1
         props = {}
         if only_k1:
             props['only_in_1'] = sorted(only_k1)
         if only_k2:
             props['only_in_2'] = sorted(only_k2)
-        dval = {}
-        for prop in inter_k:
-            v1 = el1.get(prop)
-            if len(v1) > size_limit:
-                v1 = '<value too large, size: %d>' % len(v1)
-            v2 = el2.get(prop)
-            if len(v2) > size_limit:
-                v2 = '<value too large, size: %d>' % len(v2)
-            if v1 != v2:
-                dval[prop] = {'in_1': v1, 'in_2': v2}
+        dval = {prop: {'in_1': short_value(a1[prop]),
+                       'in_2': short_value(a2[prop])}
+                for prop in keys1 & keys2 if a1[prop] != a2[prop]}
         if dval:
             props['differing_values'] = dval
         if props:
@@ -74,21 +103,29 @@ def diff_element(el1, el2, verbose_depth=0, verbose_depth_max=1):
     if ch1 != ch2:
         diff_d['id'] = el1.get('id')
 
-    only_1 = ch1.difference(ch2)
+    only_1 = ch1 - ch2
     if only_1:
         diff_d['only_in_1'] = sorted(only_1)
-    only_2 = ch2.difference(ch1)
+    only_2 = ch2 - ch1
     if only_2:
         diff_d['only_in_2'] = sorted(only_2)
 
-    inters = ch1.intersection(ch2)
+    inters = ch1 & ch2
     ch_diffs = {}
     if verbose_depth <= verbose_depth_max and diff_d:
         print('element', el1.get('id'), 'differs')
     for ch in inters:
-        ch1 = [item for item in el1 if item.get('id') == ch][0]
-        ch2 = [item for item in el2 if item.get('id') == ch][0]
-        ch_diff = diff_element(ch1, ch2, verbose_depth + 1, verbose_depth_max)
+        c1 = idx1[ch]
+        c2 = idx2[ch]
+        if len(c1) == 0 and len(c2) == 0 and c1.items() == c2.items():
+            # identical leaves: no need to recurse
+            ch_diff = None
+        else:
+            ch_diff = diff_element(c1, c2, verbose_depth + 1,
+                                   verbose_depth_max, release)
+        if release:
+            c1.clear()
+            c2.clear()
         if ch_diff:
             ch_diffs[ch] = ch_diff
             if verbose_depth <= verbose_depth_max:
@@ -127,12 +164,13 @@ if __name__ == '__main__':
         sys.exit(1)
 
     print('read', svg1, '...')
-    xml1 = ET.parse(svg1)
+    xml1 = ET.parse(svg1, parser=xml_parser)
     print('read', svg2, '...')
-    xml2 = ET.parse(svg2)
+    xml2 = ET.parse(svg2, parser=xml_parser)
 
     print('compare...')
-    diff_d = diff_element(xml1.getroot(), xml2.getroot())
+    diff_d = diff_element(xml1.getroot(), xml2.getroot(), release=True)
+    del xml1, xml2
 
     print('diff:')
     if out:
@@ -42,6 +42,11 @@ from argparse import ArgumentParser
 
 def copy_geo_projection(input, output, scale_x=1., scale_y=None, offset_x=0.,
                         offset_y=0., align_x=False, align_y=False):
+    '''
+    Copy the geotransform and projection of the input file to the output
+    file. output may also be a list of files: the source dataset is then
+    opened and read once for all of them.
+    '''
     dataset = gdal.Open(input)
     if dataset is None:
         print('Unable to open', input, 'for reading')
@@ -56,33 +61,40 @@ def copy_geo_projection(input, output, scale_x=1., scale_y=None, offset_x=0.,
     if projection is None and geotransform is None:
         raise ValueError('No projection or geotransform found on file' + input)
 
-    dataset2 = gdal.Open(output, gdal.GA_Update)
-
-    if dataset2 is None:
-        raise RuntimeError('Unable to open %s for writing' % output)
-
-    # To know more about GeoTransforms, see https://gdal.org/tutorials/geotransforms_tut.html
-    geotransform_new = list(dataset.GetGeoTransform())
-    xscale = dataset.RasterXSize / dataset2.RasterXSize
-    yscale = dataset.RasterYSize / dataset2.RasterYSize
-    if align_x:
-        yscale = xscale
-    elif align_y:
-        xscale = yscale
-    # print('xscale:', xscale, ', yscale:', yscale)
-    geotransform_new[0] += dataset.RasterXSize * offset_x * geotransform_new[1]
-    geotransform_new[1] = geotransform_new[1] * xscale * scale_x
-    print('y shift:', dataset.RasterYSize * offset_y * geotransform_new[5])
-    geotransform_new[3] = geotransform_new[3] + dataset.RasterYSize * offset_y * geotransform_new[5]
-    geotransform_new[5] = geotransform_new[5] * yscale * scale_y
-    # 2nd and 6th value of GetGeoTransform() is X/Y projection unit per pixel
-    # it should be changed if resolution (aka pixel / RasterSize) changed
-
-    if geotransform is not None:
-        dataset2.SetGeoTransform(tuple(geotransform_new))
-
-    if projection is not None:
-        dataset2.SetProjection(projection)
+    if isinstance(output, str):
+        output = [output]
+
+    for out_file in output:
+        dataset2 = gdal.Open(out_file, gdal.GA_Update)
+
+        if dataset2 is None:
+            raise RuntimeError('Unable to open %s for writing' % out_file)
+
+        # To know more about GeoTransforms, see https://gdal.org/tutorials/geotransforms_tut.html
+        geotransform_new = list(geotransform)
+        xscale = dataset.RasterXSize / dataset2.RasterXSize
+        yscale = dataset.RasterYSize / dataset2.RasterYSize
+        if align_x:
+            yscale = xscale
+        elif align_y:
+            xscale = yscale
+        # print('xscale:', xscale, ', yscale:', yscale)
+        geotransform_new[0] += dataset.RasterXSize * offset_x * geotransform_new[1]
+        geotransform_new[1] = geotransform_new[1] * xscale * scale_x
+        print('y shift:', dataset.RasterYSize * offset_y * geotransform_new[5])
+        geotransform_new[3] = geotransform_new[3] + dataset.RasterYSize * offset_y * geotransform_new[5]
+        geotransform_new[5] = geotransform_new[5] * yscale * scale_y
+        # 2nd and 6th value of GetGeoTransform() is X/Y projection unit per pixel
+        # it should be changed if resolution (aka pixel / RasterSize) changed
+
+        if geotransform is not None:
+            dataset2.SetGeoTransform(tuple(geotransform_new))
+
+        if projection is not None:
+            dataset2.SetProjection(projection)
+
+        # close the dataset to write it
+        dataset2 = None
 
     # Read this Medium article to know more about this Python script!
     # https://medium.com/@devlog/copy-and-paste-georeference-data-using-gdal-44727f46b839
@@ -107,12 +119,12 @@ if __name__ == '__main__':
                         help='calculate isotropic scaling between source and '
                         'destination, assuming the Y field of view matches')
     parser.add_argument('source', help='source .tif file with georef info')
-    parser.add_argument('destination',
-                        help='destination .tif file without georef info')
+    parser.add_argument('destination', nargs='+',
+                        help='destination .tif file(s) without georef info')
     options = parser.parse_args()
 
     if len(sys.argv) < 3:
-        print("Usage: gdalcopyproj.py source_file dest_file")
+        print("Usage: gdalcopyproj.py source_file dest_file [dest_file ...]")
         sys.exit(1)
 
     input = options.source
@@ -125,7 +137,7 @@ if __name__ == '__main__':
     align_y = options.align_y
     if align_x and align_y:
         print('align_x and align_y are self-exclusive. Use either, not both.')
-        sus.exit(1)
+        sys.exit(1)
 
     copy_geo_projection(input, output, scale_x=scale_x, scale_y=scale_y,
                         offset_x=offset_x, offset_y=offset_y,
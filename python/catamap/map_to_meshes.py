@@ -45,11 +45,12 @@ These can be installed using the command::
 
 * :mod:`~catamap.svg_to_mesh` submodule and its requirements (part of this
   project)
-* xml ElementTree
+* lxml (optional, much faster for large maps), otherwise xml ElementTree
 * numpy
 * scipy
 * Pillow (PIL) optionally for PNG/JPEG image conversion. Otherwise ImageMagick
   "convert" tool will be used (see above)
+* orjson (optional, faster decoding of JSON properties), otherwise json
 * pyclipper, used in **2D maps** and only when **zoomed zones** are used. You
   can install it via pip.
 
@@ -700,20 +701,34 @@ map_to_meshes module API
 
 from . import svg_to_mesh
 import numpy as np
-from scipy.spatial import Delaunay
 import copy
-import xml.etree.cElementTree as ET
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
 import datetime
 import math
 import json
+import logging
+import operator
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+import functools
 import os
 import os.path as osp
 import hashlib
 import collections
 import sys
+import types
 import subprocess
-import distutils.spawn
-import imp
+import select
+import concurrent.futures
+import multiprocessing
+import shutil
+import importlib
 import time  # just for exec time stats
 from argparse import ArgumentParser
 import textwrap as _textwrap
@@ -722,15 +737,6 @@ import csv
 import pprint
 import re
 import urllib
-try:
-    import PIL.Image
-except ImportError:
-    PIL = None
-# import bdalti module
-try:
-    from .altitude import bdalti
-except ImportError:
-    bdalti = None
 try:
     from soma import aims
     fake_aims = False
@@ -741,6 +747,39 @@ except ImportError:
     fake_aims = True
 
 
+# PIL, bdalti and scipy.spatial/interpolate are only needed by a few functions: they
+# are imported on first use, not to slow down the module import
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pil_image():
+    ''' PIL.Image module, or None if Pillow is not installed
+    '''
+    try:
+        import PIL.Image
+    except ImportError:
+        return None
+    return PIL.Image
+
+
+@functools.lru_cache(maxsize=None)
+def _get_bdalti():
+    ''' :mod:`catamap.altitude.bdalti` module, or None if it cannot be
+    imported
+    '''
+    try:
+        from .altitude import bdalti
+    except ImportError:
+        return None
+    return bdalti
+
+
+@functools.lru_cache(maxsize=None)
+def _get_linear_interpolator():
+    from scipy.interpolate import LinearNDInterpolator
+    return LinearNDInterpolator
+
+
 class xml_help(object):
 
     '''
@@ -749,6 +788,85 @@ class xml_help(object):
     pass
 
 
+logger = logging.getLogger(__name__)
+
+# Inkscape namespaced attributes, looked up on every element
+_ink_label = '{http://www.inkscape.org/namespaces/inkscape}label'
+_ink_id = '{http://www.inkscape.org/namespaces/inkscape}id'
+_ink_groupmode = '{http://www.inkscape.org/namespaces/inkscape}groupmode'
+# values of boolean properties meaning True
+_true_values = frozenset(('1', 'True', 'true', 'TRUE', 1, True))
+# properties tags directly copied (typed) in ItemProperties.fill_properties()
+_typed_tag_attrs = frozenset((
+    'level', 'upper_level', 'private', 'inaccessible', 'category',
+    'well_read_mode', 'grid_interval', 'marker', 'use_height_map'))
+# properties attributes read in ItemProperties.fill_properties(). Most
+# elements have none of them.
+_property_attrs = frozenset((
+    'level', 'upper_level', 'private', 'inaccessible', 'category',
+    'well_read_mode', 'grid_interval', 'marker', 'use_height_map',
+    'visibility', 'non_visibility', 'corridor', 'block', 'wall', 'well',
+    'catflap', 'hidden', 'depth_map', 'arrow', 'text', 'height_map',
+    'relative_to', 'inverse', 'contrast_floor', 'label_alt_colors',
+    'alt_colors'))
+# number in depth texts
+_depth_number_re = re.compile(r'[0-9.\-]+')
+
+
+def _intern_strings(obj):
+    ''' Recursively intern strings (and dict keys) in a decoded JSON object
+    '''
+    if isinstance(obj, str):
+        return sys.intern(obj)
+    if isinstance(obj, dict):
+        return {sys.intern(k) if isinstance(k, str) else k:
+                _intern_strings(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_intern_strings(v) for v in obj]
+    return obj
+
+
+@functools.lru_cache(maxsize=4096)
+def json_prop(value):
+    ''' Decode a JSON property string of an XML element.
+
+    The same strings (alt_colors, visibility...) are repeated on many
+    elements, thus decoded values are cached and shared between elements:
+    they must not be modified. Strings are interned, since the same colorset
+    names and labels appear in many different values.
+    '''
+    return _intern_strings(json_loads(value))
+
+
+@functools.lru_cache(maxsize=1024)
+def hex_color(color):
+    ''' Convert a "#rrggbb[aa]" color string to a tuple of floats in [0, 1]
+    '''
+    return tuple(float(int(color[i:i + 2], base=16)) / 255.
+                 for i in range(1, len(color) - 1, 2))
+
+
+def _frozen_color(color):
+    ''' Immutable copy of a color value (list, or dict of colors)
+    '''
+    if isinstance(color, list):
+        return tuple(_frozen_color(c) for c in color)
+    if isinstance(color, dict):
+        return types.MappingProxyType(
+            {k: _frozen_color(c) for k, c in color.items()})
+    return color
+
+
+def _thawed_color(color):
+    ''' New mutable color value (lists, dicts) from a frozen one
+    '''
+    if isinstance(color, tuple):
+        return [_thawed_color(c) for c in color]
+    if isinstance(color, types.MappingProxyType):
+        return {k: _thawed_color(c) for k, c in color.items()}
+    return color
+
+
 class ItemProperties(object):
     '''
     XML item properties structure, used by
@@ -766,8 +884,20 @@ class ItemProperties(object):
                   'well_read_mode', 'grid_interval', 'marker',
                   'arrow_base_height_shift', 'visibility', 'non_visibility',
                   'relative_to', 'inverse', 'use_height_map', 'contrast_floor')
-
-    prop_types = None  # will be initialized when used in get_typed_prop()
+    # one instance per XML element: fixed slots instead of a __dict__.
+    # main_group is a property, built from _main_group_tags when needed.
+    __slots__ = tuple(prop for prop in properties if prop != 'main_group') \
+        + ('_main_group', '_main_group_tags')
+    _get_props = operator.attrgetter(*__slots__)
+    _get_cmp_props = operator.attrgetter(
+        *[prop for prop in properties if prop != 'eid'])
+
+    prop_types = None  # initialized after the class definition
+    # boolean properties set either by an element attribute or by a listed
+    # label (see DefaultItemProperties.label_kinds)
+    bool_kinds = ('corridor', 'block', 'wall', # 'wireframe',
+                  'well', 'catflap', 'hidden', 'depth_map', 'arrow',
+                  'text')  # + border ?
 
     def __init__(self):
         self.reset_properties()
@@ -814,42 +944,31 @@ class ItemProperties(object):
         return ''.join(d)
 
     def copy_from(self, other):
-        for prop in self.properties:
-            setattr(self, prop, getattr(other, prop))
+        for prop, value in zip(self.__slots__, self._get_props(other)):
+            setattr(self, prop, value)
+
+    @property
+    def main_group(self):
+        if self._main_group is None and self._main_group_tags is not None:
+            # interned: it is used as a key in many dicts for each element
+            self._main_group = sys.intern('_'.join(self._main_group_tags))
+        return self._main_group
+
+    @main_group.setter
+    def main_group(self, value):
+        self._main_group = value
+        self._main_group_tags = None
 
     def __eq__(self, other):
-        for prop in self.properties:
-            if prop == 'eid':
-                continue
-            if getattr(self, prop) != getattr(other, prop):
-                return False
+        # eid is not compared
+        return self._get_cmp_props(self) == self._get_cmp_props(other)
 
     @staticmethod
     def get_typed_prop(prop, value):
-        if ItemProperties.prop_types is None:
-            ItemProperties.prop_types = {
-                'private': ItemProperties.is_true,
-                'inaccessible': ItemProperties.is_true,
-                'corridor': ItemProperties.is_true,
-                'block': ItemProperties.is_true,
-                'wall': ItemProperties.is_true,
-                # 'wireframe': ItemProperties.is_true,
-                'symbol': ItemProperties.is_true,
-                'arrow': ItemProperties.is_true,
-                'text': ItemProperties.is_true,
-                'well': ItemProperties.is_true,
-                'catflap': ItemProperties.is_true,
-                'hidden': ItemProperties.is_true,
-                'depth_map': ItemProperties.is_true,
-                'height': ItemProperties.float_value,
-                'height_shift': ItemProperties.float_value,
-                'arrow_base_height_shift': ItemProperties.float_value,
-                'border': ItemProperties.float_value,
-                'layer': ItemProperties.is_true,
-                'grid_interval': ItemProperties.float_value,
-                'inverse': ItemProperties.is_true,
-            }
         type_f = ItemProperties.prop_types.get(prop, str)
+        if type_f is str:
+            # (level, category... values are shared by many elements)
+            return sys.intern(str(value))
         if type_f is ItemProperties.is_true and value == prop:
             # speclal case which we should handle a better way...
             return True
@@ -857,7 +976,11 @@ class ItemProperties(object):
 
     @staticmethod
     def is_true(value):
-        return value in ('1', 'True', 'true', 'TRUE', 1, True)
+        try:
+            return value in _true_values
+        except TypeError:
+            # unhashable values (lists, dicts) are not "true" strings
+            return False
 
     @staticmethod
     def float_value(value):
@@ -886,70 +1009,70 @@ class ItemProperties(object):
                 if not self.name:
                     self.name = self.eid
 
+            # properties attributes actually set on the element
+            present = _property_attrs.intersection(element.keys())
+
             # properties tags
-            for prop in ('level', 'upper_level', 'private', 'inaccessible',
-                         'category', 'well_read_mode', 'grid_interval',
-                         'marker', 'use_height_map'):
-                value = element.get(prop)
-                if value is not None:
-                    setattr(self, prop,
-                            ItemProperties.get_typed_prop(prop, value))
+            for prop in present.intersection(_typed_tag_attrs):
+                setattr(self, prop, ItemProperties.get_typed_prop(
+                    prop, element.get(prop)))
 
             # alternative to "private: true", using "visibility: private"
-            visibility = element.get('visibility')
+            visibility = element.get('visibility') \
+                if 'visibility' in present else None
             #if not visibility:
                 #visibility = []
             if visibility is not None:
                 if visibility.strip().startswith('['):
-                    visibility = json.loads(visibility)
+                    visibility = json_prop(visibility)
                 else:
                     visibility = [visibility]
                 if 'private' in visibility:
                     self.private = True
                 self.visibility = visibility
 
-            non_visibility = element.get('non_visibility')
+            non_visibility = element.get('non_visibility') \
+                if 'non_visibility' in present else None
             #if not non_visibility:
                 #non_visibility = []
             if non_visibility is not None:
                 if non_visibility.strip().startswith('['):
-                    non_visibility = json.loads(non_visibility)
+                    non_visibility = json_prop(non_visibility)
                 else:
                     non_visibility = [non_visibility]
                 self.non_visibility = non_visibility
 
-            for kind in ('corridor', 'block', 'wall', # 'wireframe',
-                         'well',
-                         'catflap', 'hidden', 'depth_map', 'arrow', 'text'):
-                # + border ?
-                value = self.is_something(element, kind)
-                if value is not None:
-                    setattr(self, kind, value)
-
-            height_map = element.get('height_map')
-            if height_map is not None:
-                height_map = ItemProperties.is_true(height_map)
-                if height_map:
-                    self.depth_map = True
-                    self.inverse = True
-            relative_to = element.get('relative_to')
-            if self.depth_map and element.get('depth_map') \
-                    and relative_to is None:
+            # (same as is_something() for each kind): explicit attributes,
+            # otherwise kinds listing the element label
+            for kind in DefaultItemProperties.label_kinds.get(
+                    ItemProperties.get_label(element), ()):
+                if kind not in present:
+                    setattr(self, kind, True)
+            for kind in present.intersection(self.bool_kinds):
+                setattr(self, kind, ItemProperties.is_true(element.get(kind)))
+
+            if 'height_map' in present \
+                    and ItemProperties.is_true(element.get('height_map')):
+                self.depth_map = True
+                self.inverse = True
+            relative_to = element.get('relative_to') \
+                if 'relative_to' in present else None
+            if self.depth_map and 'depth_map' in present \
+                    and element.get('depth_map') and relative_to is None:
                 # exception: if a depth is relative to "surf" by default
                 relative_to = DefaultItemProperties.ground_level
             if relative_to is not None:
                 if relative_to in ('none', 'None'):
                     relative_to = None
                 self.relative_to = relative_to
-            inverse = element.get('inverse')
-            if inverse is not None:
-                self.inverse = ItemProperties.is_true(inverse)
+            if 'inverse' in present:
+                self.inverse = ItemProperties.is_true(element.get('inverse'))
             # if style is not None and style.get('display') == 'none':
             #     self.hidden = True
 
-            contrast_floor = element.get('contrast_floor')
-            if contrast_floor is not None:
-                if contrast_floor in ('1', 'True', 'true', 'TRUE', 1, True):
+            if 'contrast_floor' in present:
+                contrast_floor = element.get('contrast_floor')
+                if contrast_floor in _true_values:
                     contrast_floor = True
                 elif contrast_floor == 'if_no_tex':
                     contrast_floor = None
@@ -984,47 +1107,49 @@ class ItemProperties(object):
                 = self.get_arrow_base_height_shift(element)
 
             if set_defaults:
-                for prop in ('level', 'upper_level', ):
-                    if getattr(self, prop) is None:
-                        setattr(self, prop,
-                                getattr(DefaultItemProperties, prop))
+                if self.level is None:
+                    self.level = DefaultItemProperties.level
+                if self.upper_level is None:
+                    self.upper_level = DefaultItemProperties.upper_level
 
             # build main group (mesh object etc)
             priv_str = 'private' if self.private else 'public'
             access_str = ('inaccessible' if self.inaccessible
                           else 'accessible')
             if self.label is None:
-                print('no label for item:', self)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('no label for item: %s', self)
                 self.label = 'undefined'
             if self.level is None:
-                print('level None in', self)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('level None in %s', self)
                 self.level = 'undefined'
             tags = [self.label, self.level, priv_str, access_str]
             if self.category:
                 tags.append(self.category)
             if self.text:
                 tags.append('text')
-            self.main_group = '_'.join(tags)
+            # joined only if main_group is used
+            self._main_group = None
+            self._main_group_tags = tags
 
-            if element.get(
-                    '{http://www.inkscape.org/namespaces/inkscape}'
-                    'groupmode') == 'layer':
+            if element.get(_ink_groupmode) == 'layer':
                 self.layer = True
 
-            label_alt_colors = element.get('label_alt_colors')
-            if label_alt_colors is not None:
+            if 'label_alt_colors' in present:
+                label_alt_colors = element.get('label_alt_colors')
                 try:
-                    self.label_alt_colors = json.loads(label_alt_colors)
+                    self.label_alt_colors = json_prop(label_alt_colors)
                 except:
                     print('error reading JSON in label_alt_colors of', eid,
                           label)
                     print('json code:', label_alt_colors)
                     raise
 
-            alt_colors = element.get('alt_colors')
-            if alt_colors is not None:
+            if 'alt_colors' in present:
+                alt_colors = element.get('alt_colors')
                 try:
-                    self.alt_colors = json.loads(alt_colors)
+                    self.alt_colors = json_prop(alt_colors)
                 except:
                     print('error reading JSON in alt_colors of', eid, label)
                     print('json code:', alt_colors)
@@ -1043,32 +1168,46 @@ class ItemProperties(object):
         ''' remove word suffix to label (which may end with several
         variants, _word_0 etc)
         '''
-        if label == word:
+        if label == word or word not in label:
+            # (most labels: no need to look for separators)
             return label
         if label.endswith(' %s' % word) or label.endswith('_%s' % word):
             return label[:-len(word) - 1]
         for pattern in (' %s ', ' %s_', '_%s ', '_%s_'):
             p = pattern % word
             if p in label:
-                index = label.find(p)
                 sep = p[-1]
                 return label.replace(p, sep)
         return label
 
     @staticmethod
-    def remove_label_suffix(label, get_props, use_suffix=True):
+    @functools.lru_cache(maxsize=8192)
+    def _split_label_suffixes(label):
+        ''' Label without its suffixes, and properties given by them.
+
+        Labels are shared by many elements, and looked up several times for
+        each of them, thus results are cached: the returned props dict must
+        not be modified.
+        '''
         props = {}
+        for suffix, prop in DefaultItemProperties.layer_suffixes.items():
+            new_label = ItemProperties.remove_word(label, suffix)
+            if new_label != label or new_label == suffix:
+                props[prop] = DefaultItemProperties.layers_aliases.get(
+                    suffix, suffix)
+            label = new_label
+        return sys.intern(label), props
+
+    @staticmethod
+    def remove_label_suffix(label, get_props, use_suffix=True):
         if label is None:
             if get_props:
                 return None, None
             return
         if use_suffix:
-            for suffix, prop in DefaultItemProperties.layer_suffixes.items():
-                new_label = ItemProperties.remove_word(label, suffix)
-                if new_label != label and get_props or new_label == suffix:
-                    props[prop] = DefaultItemProperties.layers_aliases.get(
-                        suffix, suffix)
-                label = new_label
+            label, props = ItemProperties._split_label_suffixes(label)
+        else:
+            props = {}
         if get_props:
             return label, props
         return label
@@ -1077,16 +1216,14 @@ class ItemProperties(object):
     def get_label(element, get_props=False, use_suffix=True):
         label = element.get('label')
         if label is None:
-            label = element.get(
-                '{http://www.inkscape.org/namespaces/inkscape}label')
+            label = element.get(_ink_label)
         return ItemProperties.remove_label_suffix(label, get_props, use_suffix)
 
     @staticmethod
     def get_id(element, get_props=False, use_suffix=True):
         label = element.get('id')
         if label is None:
-            label = element.get(
-                '{http://www.inkscape.org/namespaces/inkscape}id')
+            label = element.get(_ink_id)
         return ItemProperties.remove_label_suffix(label, get_props, use_suffix)
 
     @staticmethod
@@ -1153,13 +1290,12 @@ class ItemProperties(object):
         if self.height is not None:
             return self.height
 
-        for etype, h in DefaultItemProperties.types_heights.items():
-            is_type = getattr(self, etype, None)
-            if is_type:
-                height = h
         h = DefaultItemProperties.heights.get(self.name)
         if h is not None:
-            height = h
+            return h
+        for etype, h in DefaultItemProperties.types_heights_rev:
+            if getattr(self, etype, None):
+                return h
 
         return height
 
@@ -1171,13 +1307,12 @@ class ItemProperties(object):
         if self.height_shift is not None:
             return self.height_shift
 
-        for etype, shift in DefaultItemProperties.types_height_shifts.items():
-            is_type = getattr(self, etype, None)
-            if is_type:
-                height_shift = shift
         shift = DefaultItemProperties.height_shifts.get(self.name)
         if shift is not None:
-            height_shift = shift
+            return shift
+        for etype, shift in DefaultItemProperties.types_height_shifts_rev:
+            if getattr(self, etype, None):
+                return shift
 
         return height_shift
 
@@ -1192,6 +1327,72 @@ class ItemProperties(object):
         return height_shift
 
 
+# typed properties decoders, used in get_typed_prop()
+ItemProperties.prop_types = {
+    'private': ItemProperties.is_true,
+    'inaccessible': ItemProperties.is_true,
+    'corridor': ItemProperties.is_true,
+    'block': ItemProperties.is_true,
+    'wall': ItemProperties.is_true,
+    # 'wireframe': ItemProperties.is_true,
+    'symbol': ItemProperties.is_true,
+    'arrow': ItemProperties.is_true,
+    'text': ItemProperties.is_true,
+    'well': ItemProperties.is_true,
+    'catflap': ItemProperties.is_true,
+    'hidden': ItemProperties.is_true,
+    'depth_map': ItemProperties.is_true,
+    'height': ItemProperties.float_value,
+    'height_shift': ItemProperties.float_value,
+    'arrow_base_height_shift': ItemProperties.float_value,
+    'border': ItemProperties.float_value,
+    'layer': ItemProperties.is_true,
+    'grid_interval': ItemProperties.float_value,
+    'inverse': ItemProperties.is_true,
+}
+
+
+class DepthMap(object):
+    ''' Depth map of a level, linearly interpolated over the Delaunay
+    triangulation of its depth mesh vertices.
+
+    It gives the same depths as picking the depth mesh rendered in an
+    Anatomist window (the former method), without any rendering. It has a
+    :meth:`view` method returning itself, so that it can be used in place of
+    such a window: :meth:`CataSvgToMesh.get_depth` accepts it as a view.
+    '''
+
+    def __init__(self, depth_mesh):
+        vert = np.array(depth_mesh.vertex().np, dtype=np.float64)
+        self.interpolator = None
+        if len(vert) >= 3:
+            try:
+                self.interpolator = _get_linear_interpolator()(
+                    vert[:, :2], vert[:, 2])
+            except Exception as e:
+                # degenerate depth map (aligned points...)
+                print('cannot triangulate depth map:', e)
+
+    def view(self):
+        return self
+
+    def depths(self, points):
+        ''' Depths for an array of points (N, 2 or more). NaN outside of the
+        map
+        '''
+        points = np.asarray(points, dtype=np.float64)
+        if self.interpolator is None:
+            return np.full((len(points), ), np.nan)
+        return self.interpolator(points[:, :2])
+
+
+def _read_only_table(table):
+    ''' Read-only view of a dict of labels properties, with interned keys
+    '''
+    return types.MappingProxyType(
+        {sys.intern(k): v for k, v in table.items()})
+
+
 class DefaultItemProperties(object):
     ''' Defaults and constant values.
 
@@ -1350,15 +1551,18 @@ class DefaultItemProperties(object):
         'lambert93',
         #'légende',
     }
-    hidden_labels.update(depth_map_names)
+    hidden_labels = frozenset(map(sys.intern,
+                                  hidden_labels.union(depth_map_names)))
 
-    types_height_shifts = {
+    types_height_shifts = _read_only_table({
         'corridor': 0.,
         'steet_sign': 1.5,
         'symbol': 2.5,
-    }
+    })
+    # reverse order lookup table: the last matching type wins
+    types_height_shifts_rev = tuple(reversed(types_height_shifts.items()))
 
-    height_shifts = {
+    height_shifts = _read_only_table({
         'aqueduc': 10.,
         'fontis': 2.5,
         'lys': 5.,
@@ -1388,16 +1592,18 @@ class DefaultItemProperties(object):
         'calcaire vdg': 0.,  # this one as walls
         'PE': 0.,
         'PE anciennes galeries big': -9.,
-    }
+    })
 
-    types_heights = {
+    types_heights = _read_only_table({
         'corridor': 2.,
         'stair': 1.,
         'block': 1.,
         'symbol': 0.3,
-    }
+    })
+    # reverse order lookup table: the last matching type wins
+    types_heights_rev = tuple(reversed(types_heights.items()))
 
-    heights = {
+    heights = _read_only_table({
         'esc': 1.,
         'cuves': 1.5,
         'plaques rues': 0.5,
@@ -1421,9 +1627,9 @@ class DefaultItemProperties(object):
         'PE': 10.5,
         'PE anciennes galeries big': -10.,
         'mur': 2.,
-    }
+    })
 
-    well_read_modes = {
+    well_read_modes = _read_only_table({
         'PS': 'path',
         'PS galeries big': 'path',
         'PE': 'path',
@@ -1439,7 +1645,46 @@ class DefaultItemProperties(object):
         'échelle galeries big': 'group',
         'PSh sans': 'group',
         'sans': 'path',
-    }
+    })
+
+
+class SymbolCenters(object):
+    ''' Growable array of symbols centers (one row per symbol copy), stored
+    as a single numpy array rather than a list of small lists.
+    '''
+
+    def __init__(self, capacity=16):
+        self.data = np.empty((capacity, 3), dtype=np.float32)
+        self.size = 0
+
+    def append(self, center):
+        if self.size == len(self.data):
+            data = np.empty((self.size * 3 // 2 + 1, 3), dtype=np.float32)
+            data[:self.size] = self.data
+            self.data = data
+        self.data[self.size] = center
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def centers(self):
+        return self.data[:self.size]
+
+
+def _build_label_kinds():
+    ''' Reverse index of DefaultItemProperties.<kind>_labels lists: label ->
+    tuple of kinds (see ItemProperties.bool_kinds)
+    '''
+    label_kinds = {}
+    for kind in ItemProperties.bool_kinds:
+        for label in getattr(DefaultItemProperties, '%s_labels' % kind, ()):
+            label_kinds.setdefault(label, []).append(kind)
+    return {label: tuple(kinds) for label, kinds in label_kinds.items()}
+
+
+DefaultItemProperties.label_kinds = _build_label_kinds()
 
 
 class CataSvgToMesh(svg_to_mesh.SvgToMesh):
@@ -1450,6 +1695,35 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
     proto_scale = np.array([[0.5, 0,   0],
                             [0,   0.5, 0],
                             [0,   0,   1]])
+    # symbol layers readers, by label, then by label prefix
+    symbol_readers = {
+        'etiage': 'read_water_scale',
+        'fontis': 'read_fontis',
+        'fontis_inf': 'read_fontis',
+        'fontis private': 'read_fontis',
+        'fontis private_inf': 'read_fontis',
+        'stair_symbol': 'read_stair_symbol',
+        'arche': 'read_arch',
+        'ossuaire': 'read_bones',
+    }
+    symbol_prefix_readers = (
+        ('lys', 'read_lily'),
+        ('grande_plaque', 'read_large_sign'),
+    )
+    # markers models attributes, by marker type (others use photos ones)
+    marker_model_names = {
+        'sounds': 'sounds_marker_model',
+        'photos': 'photos_marker_model',
+    }
+    # Anatomist instance, see get_anatomist()
+    _anatomist = None
+    # depth layers children readers, by tag: (reader, cleaner, skip children)
+    depth_readers = {
+        'g': ('read_depth_group', 'clear_depth_group', False),
+        'path': ('read_depth_arrow', None, False),
+        'text': ('read_depth_text', None, True),
+        'rect': ('read_depth_rect', None, True),
+    }
 
     def __init__(self, concat_mesh='list_bygroup', skull_mesh=None,
                  headless=True):
@@ -1467,6 +1741,11 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         self.large_sign_mesh = None
         self.sounds_marker_model = None
         self.photos_marker_model = None
+        # models built by symbol_model(), even if they turned out to be None
+        self.built_symbol_models = set()
+        self.symbols_xml = None
+        # marker type -> model attribute name, for each markers layer
+        self.marker_types = {}
         self.level = ''
         self.sounds = []
         self.sounds_private = []
@@ -1477,7 +1756,24 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         self.colorset_inheritance = {}
         self.map_name = 'map_3d'
         self.lambert93_z_scaling = False
-
+        # files listing of markers directories, shared by all markers layers
+        self.markers_dir_files = {}
+        # symbols positions, by (group, model), see read_symbol()
+        self.symbol_centers = {}
+        # get_alt_color() results, see there
+        self.alt_color_cache = {}
+        # depth points read in the current depth layer, see add_depth_point()
+        self.pending_depth_points = {}
+
+        self.get_anatomist(headless)
+
+    @classmethod
+    def get_anatomist(cls, headless=True):
+        ''' Anatomist instance, started once for all CataSvgToMesh objects
+        '''
+        if cls._anatomist is not None:
+            return cls._anatomist
+        a = None
         if headless:
             try:
                 from anatomist import headless as ana
@@ -1491,6 +1787,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             except Exception:
                 raise RuntimeError('anatomist is not available. It is needed '
                                    'for CataSvgToMesh to work.')
+        CataSvgToMesh._anatomist = a
+        return a
 
     def filter_element(self, xml_element, style=None):
 
@@ -1505,7 +1803,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     'parse layer', xml_element.get('id'),
                     xml_element.get(
                         '{http://www.inkscape.org/namespaces/inkscape}label'))
-                if xml_element.tag.endswith('}metadata'):
+                if svg_to_mesh.tag_name(xml_element.tag) == 'metadata':
                     z_scale = xml_element.get('z_scale')
                     if z_scale is not None:
                         if z_scale in ('auto', 'Auto', 'AUTO'):
@@ -1522,8 +1820,9 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     colorset_inheritance = xml_element.get(
                         'colorset_inheritance')
                     if colorset_inheritance:
-                        colorset_inheritance = json.loads(colorset_inheritance)
+                        colorset_inheritance = json_loads(colorset_inheritance)
                         self.colorset_inheritance = colorset_inheritance
+                        self.alt_color_cache = {}
                         print('COLORSET INHERITANCE:', colorset_inheritance)
 
         item_props = ItemProperties()
@@ -1538,18 +1837,15 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
 
         if len(self.depth_maps) != 0:
             # while reading depth indications layer, process things differently
-            if xml_element.tag.endswith('g'):
-                return (self.read_depth_group,
-                        [self.clear_depth_group] + clean_return, False)
-            elif xml_element.tag.endswith('path'):
-                return (self.read_depth_arrow, clean_return, False)
-            elif xml_element.tag.endswith('text'):
-                return (self.read_depth_text, clean_return, True)
-            elif xml_element.tag.endswith('rect'):
-                return (self.read_depth_rect, clean_return, True)
-            else:
+            depth_reader = self.depth_readers.get(
+                svg_to_mesh.tag_name(xml_element.tag))
+            if depth_reader is None:
                 print('unknown depth child:', xml_element)
                 return (self.noop, clean_return, True)
+            reader, cleaner, skip_children = depth_reader
+            if cleaner is not None:
+                clean_return = [getattr(self, cleaner)] + clean_return
+            return (getattr(self, reader), clean_return, skip_children)
 
         self.item_props = item_props
         # keep this properties for the whole group (hope there are no
@@ -1594,13 +1890,13 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                 sname = item_props.marker
                 if item_props.private:
                     sname += '_private'
-                mmname = '%s_marker_model' % item_props.marker
-                model = getattr(self, mmname, None)
+                mmname = self.marker_model_names.get(item_props.marker)
+                model = None
+                if mmname is not None:
+                    model = self.symbol_model(mmname)
                 if model is None:
                     mmname = 'photos_marker_model'
-                    model = self.photos_marker_model
-                if not hasattr(self, 'marker_types'):
-                    self.marker_types = {}
+                    model = self.symbol_model(mmname)
                 self.marker_types[sname] = mmname
                 self.read_markers(xml_element, model, sname)
                 return (self.noop, clean_return, True)
@@ -1618,21 +1914,14 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             return (self.read_well, clean_return, False)
 
         if label is not None:
-            if label == 'etiage':
-                return (self.read_water_scale, clean_return, True)
-            elif label in ('fontis', 'fontis_inf', 'fontis private',
-                           'fontis private_inf'):
-                return (self.read_fontis, clean_return, True)
-            elif label in ('stair_symbol', ):
-                return (self.read_stair_symbol, clean_return, True)
-            elif label == 'arche':
-                return (self.read_arch, clean_return, True)
-            elif label.startswith('lys'):
-                return (self.read_lily, clean_return, True)
-            elif label.startswith('grande_plaque'):
-                return (self.read_large_sign, clean_return, True)
-            elif label == 'ossuaire':
-                return (self.read_bones, clean_return, True)
+            reader = self.symbol_readers.get(label)
+            if reader is None:
+                for prefix, prefix_reader in self.symbol_prefix_readers:
+                    if label.startswith(prefix):
+                        reader = prefix_reader
+                        break
+            if reader is not None:
+                return (getattr(self, reader), clean_return, True)
 
         return (None, clean_return, False)
 
@@ -1654,8 +1943,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             # print('arrow')
             vert = mesh.vertex()
             nv = len(vert)
-            for i in range(nv):
-                vert[i][2] = i / (nv - 1)
+            if nv != 0:
+                vert.np[:, 2] = np.linspace(0., 1., nv, dtype=np.float32)
             ## create mesh if it doesn't exist, and assign it arrow indices
             #gmesh = self.mesh_dict.setdefault(self.main_group,
                                               #aims.AimsTimeSurface(2))
@@ -1674,24 +1963,11 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         if symbol_scale is not None:
             self.symbol_scale = float(symbol_scale)
 
-        if self.skull_mesh is None:
-            self.skull_mesh = self.make_skull_model(xml)
-        if self.water_scale_model is None:
-            self.water_scale_model \
-                = self.make_water_scale_model((0., 0., 0.), 1.)
-        if self.fontis_mesh is None:
-            self.fontis_mesh = self.make_fontis_model(xml)
-        if self.stair_symbol_mesh is None:
-            self.stair_symbol_mesh = self.make_stair_symbol_model()
-        if self.lily_mesh is None:
-            self.lily_mesh = self.make_lily_model(xml)
-        if self.large_sign_mesh is None:
-            self.large_sign_mesh = self.make_large_sign_model(xml)
-        if self.sounds_marker_model is None:
-            self.sounds_marker_model = self.make_sounds_marker_model()
-        if self.photos_marker_model is None:
-            self.photos_marker_model = self.make_photos_marker_model()
+        # symbols models are built from this tree when first needed
+        self.symbols_xml = xml
         res = super(CataSvgToMesh, self).read_paths(xml)
+        self.merge_symbols()
+        self.flush_depth_points()
 
         #print('======= read_path done =======')
         #print('groups properties:', len(self.group_properties))
@@ -1727,25 +2003,23 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
 
         # print('read_well path')
         mesh = self.read_path(well_xml, trans, style)
-        bmin = list(mesh.vertex()[0])
-        bmax = list(bmin)
-        for v in mesh.vertex():
-            if v[0] < bmin[0]:
-                bmin[0] = v[0]
-            if v[0] > bmax[0]:
-                bmax[0] = v[0]
-            if v[1] < bmin[1]:
-                bmin[1] = v[1]
-            if v[1] > bmax[1]:
-                bmax[1] = v[1]
-        center = ((bmin[0] + bmax[0]) / 2, (bmin[1] + bmax[1]) / 2)
-        radius = (bmax[0] - bmin[0]) / 2
-        z = bmin[2] * self.z_scale
-        height = 20. * self.z_scale
         wells_spec = self.mesh_dict.setdefault(props.main_group, [])
-        wells_spec.append((center, radius, z, height))
+        wells_spec.append(self.well_spec(mesh))
         # print('well_type:', well_type, len(wells_spec))
 
+    def well_spec(self, mesh):
+        ''' (center, radius, z, height) of a well from its outline mesh
+        '''
+        vert = np.asarray(mesh.vertex().np)
+        bmin = vert[:, :2].min(axis=0)
+        bmax = vert[:, :2].max(axis=0)
+        center = (float(bmin[0] + bmax[0]) / 2, float(bmin[1] + bmax[1]) / 2)
+        radius = float(bmax[0] - bmin[0]) / 2
+        # (z of the 1st point)
+        z = float(vert[0, 2]) * self.z_scale
+        height = 20. * self.z_scale
+        return (center, radius, z, height)
+
     def read_well_group(self, stair_xml, trans, style=None):
         props = self.group_properties[self.main_group]
         props.well = True
@@ -1766,112 +2040,179 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             trans = self.get_transform(child, trans)
 
             mesh = self.read_path(child, trans, style)
-            bmin = list(mesh.vertex()[0])
-            bmax = list(bmin)
-            for v in mesh.vertex():
-                if v[0] < bmin[0]:
-                    bmin[0] = v[0]
-                if v[0] > bmax[0]:
-                    bmax[0] = v[0]
-                if v[1] < bmin[1]:
-                    bmin[1] = v[1]
-                if v[1] > bmax[1]:
-                    bmax[1] = v[1]
-            center = ((bmin[0] + bmax[0]) / 2, (bmin[1] + bmax[1]) / 2)
-            radius = (bmax[0] - bmin[0]) / 2
-            z = bmin[2] * self.z_scale
-            height = 20. * self.z_scale
             wells_spec = self.mesh_dict.setdefault(self.main_group, [])
-            wells_spec.append((center, radius, z, height))
+            wells_spec.append(self.well_spec(mesh))
 
-    def read_bones(self, bones_xml, trans, style=None):
-        bbox = self.boundingbox(bones_xml[0], trans)
-        mesh = self.mesh_dict.setdefault(self.main_group,
-                                         aims.AimsTimeSurface(3))
-        center = [(bbox[0][0] + bbox[1][0]) / 2,
+    def read_symbol(self, symbol_xml, trans, model_mesh):
+        ''' Place a copy of a symbol model mesh at the center of the first
+        child of symbol_xml, in the current main group mesh.
+
+        Copies are only recorded here: they are built all at once for each
+        group and model in :meth:`merge_symbols`.
+        '''
+        bbox = self.boundingbox(symbol_xml[0], trans)
+        self.mesh_dict.setdefault(self.main_group, aims.AimsTimeSurface(3))
+        center = ((bbox[0][0] + bbox[1][0]) / 2,
                   (bbox[0][1] + bbox[1][1]) / 2,
-                  0.]
-        tr = aims.AffineTransformation3d()
-        tr.setTranslation(center)
-        skull_mesh = aims.AimsTimeSurface(self.skull_mesh)
-        aims.SurfaceManip.meshTransform(skull_mesh, tr)
-        aims.SurfaceManip.meshMerge(mesh, skull_mesh)
-        if 'material' not in mesh.header():
-            mesh.header().update(skull_mesh.header())
-            if 'material' in mesh.header():
-                mat = mesh.header()['material']
-            else:
-                mat = {}
-            mat['face_culling'] = 0
-            mesh.header()['material'] = mat
+                  0.)
+        key = (self.main_group, id(model_mesh))
+        centers = self.symbol_centers.get(key)
+        if centers is None:
+            centers = (model_mesh, SymbolCenters())
+            self.symbol_centers[key] = centers
+        centers[1].append(center)
+
+    @staticmethod
+    def replicated_mesh(mesh, translations):
+        ''' Mesh made of translated copies of a mesh, one for each
+        translation, built all at once
+        '''
+        translations = np.asarray(translations, dtype=np.float32)
+        n = len(translations)
+        vert = np.asarray(mesh.vertex().np)
+        poly = np.asarray(mesh.polygon().np)
+        norm = np.asarray(mesh.normal().np)
+        rmesh = type(mesh)()
+        rmesh.vertex().assign(
+            (vert[np.newaxis, :, :]
+             + translations[:, np.newaxis, :]).reshape(-1, 3))
+        rmesh.polygon().assign(
+            (poly[np.newaxis, :, :]
+             + (np.arange(n, dtype=np.uint32)
+                * len(vert)).reshape(n, 1, 1)).reshape(-1, poly.shape[1]))
+        if len(norm) == len(vert):
+            rmesh.normal().assign(np.tile(norm, (n, 1)))
+        rmesh.header().update(mesh.header())
+        return rmesh
+
+    @staticmethod
+    def merged_meshes(meshes, mesh_type=None):
+        ''' Concatenate meshes into a single new one, in a single pass
+        (vertices stacked, polygons indices shifted by the number of vertices
+        of the previous meshes), rather than merging them one by one
+        '''
+        if mesh_type is None:
+            mesh_type = type(meshes[0])
+        verts = [np.asarray(m.vertex().np) for m in meshes]
+        polys = [np.asarray(m.polygon().np) for m in meshes]
+        norms = [np.asarray(m.normal().np) for m in meshes]
+        offsets = np.cumsum([0] + [len(v) for v in verts[:-1]])
+        mesh = mesh_type()
+        mesh.vertex().assign(np.vstack(verts))
+        mesh.polygon().assign(np.vstack(
+            [p + np.uint32(o) for p, o in zip(polys, offsets)]))
+        if all(len(n) == len(v) for n, v in zip(norms, verts)):
+            mesh.normal().assign(np.vstack(norms))
+        return mesh
+
+    @staticmethod
+    def cylinders_mesh(points1, points2, radius, facets):
+        ''' Mesh of open, flat-faceted cylinders along the segments
+        (points1[i], points2[i]), all built at once rather than one
+        SurfaceGenerator.cylinder() call and merge per segment
+        '''
+        p1 = np.asarray(points1, dtype=np.float64).reshape(-1, 3)
+        p2 = np.asarray(points2, dtype=np.float64).reshape(-1, 3)
+        n = len(p1)
+        axis = p2 - p1
+        axis /= np.linalg.norm(axis, axis=1)[:, np.newaxis]
+        # direct orthonormal frame (u, v, axis) for each cylinder
+        ref = np.zeros((n, 3))
+        ref[:, 0] = 1.
+        ref[np.abs(axis[:, 0]) > 0.9] = (0., 1., 0.)
+        u = np.cross(axis, ref)
+        u /= np.linalg.norm(u, axis=1)[:, np.newaxis]
+        v = np.cross(axis, u)
+
+        def ring(angles):
+            # (cylinder, angle, xyz) unit directions
+            return np.cos(angles)[np.newaxis, :, np.newaxis] \
+                * u[:, np.newaxis, :] \
+                + np.sin(angles)[np.newaxis, :, np.newaxis] \
+                * v[:, np.newaxis, :]
+
+        theta = np.arange(facets + 1) * (2 * np.pi / facets)
+        rad = radius * ring(theta)
+        # each facet has its own 4 vertices (and normal), for flat shading
+        a = rad[:, :-1, np.newaxis, :]
+        b = rad[:, 1:, np.newaxis, :]
+        c1 = p1[:, np.newaxis, np.newaxis, :]
+        c2 = p2[:, np.newaxis, np.newaxis, :]
+        vert = np.concatenate((c1 + a, c1 + b, c2 + a, c2 + b), axis=2)
+        norm = np.repeat(ring(theta[:-1] + np.pi / facets)[:, :, np.newaxis, :],
+                         4, axis=2)
+        poly = np.array([(0, 1, 3), (0, 3, 2)], dtype=np.uint32)[np.newaxis] \
+            + 4 * np.arange(n * facets, dtype=np.uint32).reshape(-1, 1, 1)
+        mesh = aims.AimsTimeSurface_3()
+        mesh.vertex().assign(vert.reshape(-1, 3).astype(np.float32))
+        mesh.polygon().assign(poly.reshape(-1, 3))
+        mesh.normal().assign(norm.reshape(-1, 3).astype(np.float32))
+        return mesh
+
+    def merge_symbols(self):
+        ''' Build the symbols copies recorded by :meth:`read_symbol`, and
+        merge them in their groups meshes
+        '''
+        for (main_group, _), (model_mesh, centers) \
+                in self.symbol_centers.items():
+            try:
+                model_mesh = aims.AimsTimeSurface(model_mesh)
+            except Exception:
+                print('Mesh error:', type(model_mesh), 'in', main_group)
+                continue
+            mesh = self.mesh_dict[main_group]
+            symbol_mesh = self.replicated_mesh(model_mesh, centers.centers)
+            aims.SurfaceManip.meshMerge(mesh, symbol_mesh)
+            if 'material' not in mesh.header():
+                mesh.header().update(symbol_mesh.header())
+                if 'material' in mesh.header():
+                    mat = mesh.header()['material']
+                else:
+                    mat = {}
+                mat['face_culling'] = 0
+                mesh.header()['material'] = mat
+        self.symbol_centers = {}
+
+    def symbol_model(self, attr):
+        ''' Symbol model (mesh, or dict of meshes) stored in the attribute
+        attr. It is built on first use, so that maps without a given symbol
+        do not pay for its model.
+        '''
+        model = getattr(self, attr)
+        if model is not None or attr in self.built_symbol_models:
+            return model
+        xml = self.symbols_xml
+        makers = {
+            'skull_mesh': lambda: self.make_skull_model(xml),
+            'water_scale_model':
+                lambda: self.make_water_scale_model((0., 0., 0.), 1.),
+            'fontis_mesh': lambda: self.make_fontis_model(xml),
+            'stair_symbol_mesh': self.make_stair_symbol_model,
+            'lily_mesh': lambda: self.make_lily_model(xml),
+            'large_sign_mesh': lambda: self.make_large_sign_model(xml),
+            'sounds_marker_model': self.make_sounds_marker_model,
+            'photos_marker_model': self.make_photos_marker_model,
+        }
+        # some models builders use (and change) the current group
+        main_group = self.main_group
+        model = makers[attr]()
+        self.main_group = main_group
+        setattr(self, attr, model)
+        self.built_symbol_models.add(attr)
+        return model
+
+    def read_bones(self, bones_xml, trans, style=None):
+        self.read_symbol(bones_xml, trans, self.symbol_model('skull_mesh'))
 
     def read_fontis(self, fontis_xml, trans, style=None):
-        bbox = self.boundingbox(fontis_xml[0], trans)
-        mesh = self.mesh_dict.setdefault(self.main_group,
-                                         aims.AimsTimeSurface(3))
-        center = [(bbox[0][0] + bbox[1][0]) / 2,
-                  (bbox[0][1] + bbox[1][1]) / 2,
-                  0.]
-        tr = aims.AffineTransformation3d()
-        tr.setTranslation(center)
-        fontis_mesh = aims.AimsTimeSurface(self.fontis_mesh)
-        aims.SurfaceManip.meshTransform(fontis_mesh, tr)
-        aims.SurfaceManip.meshMerge(mesh, fontis_mesh)
-        if 'material' not in mesh.header():
-            mesh.header().update(fontis_mesh.header())
-            if 'material' in mesh.header():
-                mat = mesh.header()['material']
-            else:
-                mat = {}
-            mat['face_culling'] = 0
-            mesh.header()['material'] = mat
+        self.read_symbol(fontis_xml, trans, self.symbol_model('fontis_mesh'))
 
     def read_lily(self, lily_xml, trans, style=None):
-        bbox = self.boundingbox(lily_xml[0], trans)
-        mesh = self.mesh_dict.setdefault(self.main_group,
-                                         aims.AimsTimeSurface(3))
-        center = [(bbox[0][0] + bbox[1][0]) / 2,
-                  (bbox[0][1] + bbox[1][1]) / 2,
-                  0.]
-        tr = aims.AffineTransformation3d()
-        tr.setTranslation(center)
-        lily_mesh = aims.AimsTimeSurface(self.lily_mesh)
-        aims.SurfaceManip.meshTransform(lily_mesh, tr)
-        aims.SurfaceManip.meshMerge(mesh, lily_mesh)
-        if 'material' not in mesh.header():
-            mesh.header().update(lily_mesh.header())
-            if 'material' in mesh.header():
-                mat = mesh.header()['material']
-            else:
-                mat = {}
-            mat['face_culling'] = 0
-            mesh.header()['material'] = mat
-
-    def read_large_sign(self, lily_xml, trans, style=None):
-        bbox = self.boundingbox(lily_xml[0], trans)
-        mesh = self.mesh_dict.setdefault(self.main_group,
-                                         aims.AimsTimeSurface(3))
-        center = [(bbox[0][0] + bbox[1][0]) / 2,
-                  (bbox[0][1] + bbox[1][1]) / 2,
-                  0.]
-        tr = aims.AffineTransformation3d()
-        tr.setTranslation(center)
-        try:
-            lily_mesh = aims.AimsTimeSurface(self.large_sign_mesh)
-        except Exception:
-            print('Mesh error:', type(self.large_sign_mesh), 'in',
-                  self.item_props)
-            return
-        aims.SurfaceManip.meshTransform(lily_mesh, tr)
-        aims.SurfaceManip.meshMerge(mesh, lily_mesh)
-        if 'material' not in mesh.header():
-            mesh.header().update(lily_mesh.header())
-            if 'material' in mesh.header():
-                mat = mesh.header()['material']
-            else:
-                mat = {}
-            mat['face_culling'] = 0
-            mesh.header()['material'] = mat
+        self.read_symbol(lily_xml, trans, self.symbol_model('lily_mesh'))
+
+    def read_large_sign(self, sign_xml, trans, style=None):
+        self.read_symbol(sign_xml, trans,
+                         self.symbol_model('large_sign_mesh'))
 
     def read_arch(self, arch_xml, trans, style=None):
         ## don't apply transform, we will do it later on the mesh
@@ -1903,37 +2244,27 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         center = [(bbox[0][0] + bbox[1][0]) / 2,
                   (bbox[0][1] + bbox[1][1]) / 2,
                   4.]
-        tr = aims.AffineTransformation3d()
-        tr.setTranslation(center)
-        for mesh_id, ws_model in self.water_scale_model.items():
-            ws_mesh = aims.AimsTimeSurface(ws_model)
-            aims.SurfaceManip.meshTransform(ws_mesh, tr)
+        for mesh_id, ws_model in self.symbol_model(
+                'water_scale_model').items():
+            ws_mesh = self.translated_mesh(ws_model, center)
             mesh = self.mesh_dict.setdefault(mesh_id, type(ws_mesh)())
             if len(mesh.header()) == 0:
                 mesh.header().update(ws_model.header())
                 self.group_properties[mesh_id] = props
             aims.SurfaceManip.meshMerge(mesh, ws_mesh)
 
+    @staticmethod
+    def translated_mesh(mesh, translation):
+        ''' Translated copy of a mesh. Vertices are just shifted, rather than
+        going through a general affine transformation.
+        '''
+        tmesh = type(mesh)(mesh)
+        tmesh.vertex().np[:] += np.asarray(translation, dtype=np.float32)
+        return tmesh
+
     def read_stair_symbol(self, st_xml, trans, style=None):
-        bbox = self.boundingbox(st_xml[0], trans)
-        mesh = self.mesh_dict.setdefault(self.main_group,
-                                         aims.AimsTimeSurface(3))
-        center = [(bbox[0][0] + bbox[1][0]) / 2,
-                  (bbox[0][1] + bbox[1][1]) / 2,
-                  0.]
-        tr = aims.AffineTransformation3d()
-        tr.setTranslation(center)
-        stair_mesh = aims.AimsTimeSurface(self.stair_symbol_mesh)
-        aims.SurfaceManip.meshTransform(stair_mesh, tr)
-        aims.SurfaceManip.meshMerge(mesh, stair_mesh)
-        if 'material' not in mesh.header():
-            mesh.header().update(stair_mesh.header())
-            if 'material' in mesh.header():
-                mat = mesh.header()['material']
-            else:
-                mat = {}
-            mat['face_culling'] = 0
-            mesh.header()['material'] = mat
+        self.read_symbol(st_xml, trans,
+                         self.symbol_model('stair_symbol_mesh'))
 
     def make_psh_sq_well(self, center, radius, z, height, props, faces=8):
         # square well
@@ -1961,7 +2292,6 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         a = np.pi / 6.
         hl = radius - r0
         nv0 = len(vert)
-        nv = nv0
         stair_step = 0.3 * self.z_scale
         phb0 = p1 + r0 * aims.Point3df(-np.sin(a), np.cos(a), 0.)
         phb1 = p1 + r0 * aims.Point3df(np.sin(a), np.cos(a), 0.)
@@ -1972,27 +2302,38 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         phb7 = p1 + r0 * aims.Point3df(-np.cos(a), np.sin(a), 0.)
         phb6 = p1 + r0 * aims.Point3df(-np.cos(a), -np.sin(a), 0.)
 
-        for zbari in range(1, int(height / stair_step)):
-            zbar = z + zbari * stair_step
-            ph0 = aims.Point3df(phb0[0], phb0[1], zbar)
-            ph1 = aims.Point3df(phb1[0], phb1[1], zbar)
-            ph2 = aims.Point3df(phb2[0], phb2[1], zbar)
-            ph3 = aims.Point3df(phb3[0], phb3[1], zbar)
-            ph4 = aims.Point3df(phb4[0], phb4[1], zbar)
-            ph5 = aims.Point3df(phb5[0], phb5[1], zbar)
-            ph6 = aims.Point3df(phb6[0], phb6[1], zbar)
-            ph7 = aims.Point3df(phb7[0], phb7[1], zbar)
-
-            vert += [ph0, ph1, ph0 + (0., hl, 0.), ph1 + (0., hl, 0.),
-                     ph2, ph3, ph2 + (hl, 0., 0.), ph3 + (hl, 0., 0.),
-                     ph4, ph5, ph4 + (0., -hl, 0.), ph5 + (0., -hl, 0.),
-                     ph6, ph7, ph6 + (-hl, 0., 0.), ph7 + (-hl, 0., 0.)]
-            poly += [(nv, nv + 1, nv + 3), (nv, nv + 3, nv + 2),
-                     (nv + 4, nv + 5, nv + 7), (nv + 4, nv + 7, nv + 6),
-                     (nv + 8, nv + 9, nv + 11), (nv + 8, nv + 11, nv + 10),
-                     (nv + 12, nv + 13, nv + 15), (nv + 12, nv + 15, nv + 14)]
-            nv += 16
-        norm += [(0., 0., 1.)] * (len(vert) - nv0)
+        # one stair step: 4 steps around the well (16 vertices, 8 triangles),
+        # at z = 0
+        step_vert = np.array(
+            [[phb0[0], phb0[1]], [phb1[0], phb1[1]],
+             [phb0[0], phb0[1] + hl], [phb1[0], phb1[1] + hl],
+             [phb2[0], phb2[1]], [phb3[0], phb3[1]],
+             [phb2[0] + hl, phb2[1]], [phb3[0] + hl, phb3[1]],
+             [phb4[0], phb4[1]], [phb5[0], phb5[1]],
+             [phb4[0], phb4[1] - hl], [phb5[0], phb5[1] - hl],
+             [phb6[0], phb6[1]], [phb7[0], phb7[1]],
+             [phb6[0] - hl, phb6[1]], [phb7[0] - hl, phb7[1]]],
+            dtype=np.float32)
+        step_vert = np.hstack((step_vert, np.zeros((16, 1), dtype=np.float32)))
+        step_poly = np.array([(0, 1, 3), (0, 3, 2), (4, 5, 7), (4, 7, 6),
+                              (8, 9, 11), (8, 11, 10), (12, 13, 15),
+                              (12, 15, 14)], dtype=np.uint32)
+
+        # all steps at once
+        nsteps = max(int(height / stair_step) - 1, 0)
+        if nsteps != 0:
+            zbars = z + np.arange(1, nsteps + 1) * stair_step
+            steps_vert = np.repeat(step_vert[np.newaxis, :, :], nsteps,
+                                   axis=0)
+            steps_vert[:, :, 2] = zbars[:, np.newaxis]
+            steps_poly = step_poly[np.newaxis, :, :] \
+                + (nv0 + 16 * np.arange(nsteps, dtype=np.uint32)).reshape(
+                    nsteps, 1, 1)
+            vert.assign(np.vstack((np.asarray(vert.np),
+                                   steps_vert.reshape(-1, 3))))
+            poly.assign(np.vstack((np.asarray(poly.np),
+                                   steps_poly.reshape(-1, 3))))
+            norm += [(0., 0., 1.)] * (nsteps * 16)
         color = self.get_alt_color(props)
         if not color:
             color = [0.5, 0.7, .6, 1.]
@@ -2007,24 +2348,27 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         pole2 = p1 - aims.Point3df(radius, 0., 0.)
         r0 = 0.05
         r1 = 0.025
-        ladder = aims.SurfaceGenerator.cylinder({
-            'point1': pole1,
-            'point2': p2 + aims.Point3df(radius, 0., 0.), 'radius': r0,
-            'facets': 4, 'smooth': True, 'closed': False})
-        ladder2 = aims.SurfaceGenerator.cylinder({
+        # both poles are the same cylinder, 2 * radius apart
+        pole = aims.SurfaceGenerator.cylinder({
             'point1': pole2,
             'point2': p2 - aims.Point3df(radius, 0., 0.), 'radius': r0,
             'facets': 4, 'smooth': True, 'closed': False})
-        aims.SurfaceManip.meshMerge(ladder, ladder2)
+        ladder = self.replicated_mesh(pole, [(2 * radius, 0., 0.),
+                                             (0., 0., 0.)])
         stair_step = 0.3 * self.z_scale
-        for zbari in range(1, int(height / stair_step)):
-            zbar = z + zbari * stair_step
+        nsteps = max(int(height / stair_step) - 1, 0)
+        if nsteps != 0:
+            # all bars are the same, only shifted in z
+            zbar = z + stair_step
             b1 = aims.Point3df(pole1[0], pole1[1], zbar)
             b2 = aims.Point3df(pole2[0], pole2[1], zbar)
             bar = aims.SurfaceGenerator.cylinder({
                 'point1': b1, 'point2': b2, 'radius': r1, 'facets': 4,
                 'smooth': True, 'closed': False})
-            aims.SurfaceManip.meshMerge(ladder, bar)
+            shifts = np.zeros((nsteps, 3))
+            shifts[:, 2] = np.arange(nsteps) * stair_step
+            ladder = self.merged_meshes(
+                [ladder, self.replicated_mesh(bar, shifts)])
         color = self.get_alt_color(props)
         if not color:
             color = [1., 0., .6, 1.]
@@ -2042,24 +2386,34 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         poly = well.polygon()
         a = np.pi / 6.
         nv0 = len(vert)
-        nv = nv0
         stair_step = 0.2 * self.z_scale
-        angle = 0.
-        for zbari in range(1, int(height / stair_step)):
-            zbar = z + zbari * stair_step
-            ph1 = aims.Point3df(p1)
-            ph1[2] = zbar
-            ph0 = ph1 - (0., 0., stair_step)
-            ph2 = ph0 + radius * aims.Point3df(np.cos(angle), np.sin(angle),
-                                               0.)
-            ph3 = ph2 + aims.Point3df(0., 0., stair_step)
-            angle += a
-            ph4 = ph1 + radius * aims.Point3df(np.cos(angle), np.sin(angle),
-                                               0.)
-            vert += [ph0, ph1, ph2, ph3, ph1, ph3, ph4]
-            poly += [(nv, nv + 2, nv + 1), (nv + 1, nv + 2, nv + 3),
-                     (nv + 4, nv + 5, nv + 6)]
-            nv += 7
+        # each step is 7 vertices: ph0, ph1, ph2, ph3, ph1, ph3, ph4
+        step_poly = np.array([(0, 2, 1), (1, 2, 3), (4, 5, 6)],
+                             dtype=np.uint32)
+        nsteps = max(int(height / stair_step) - 1, 0)
+        if nsteps != 0:
+            zbars = z + np.arange(1, nsteps + 1) * stair_step
+            angles = np.arange(nsteps + 1) * a
+            cos_a = radius * np.cos(angles)
+            sin_a = radius * np.sin(angles)
+            steps_vert = np.empty((nsteps, 7, 3), dtype=np.float32)
+            steps_vert[:, :, 0] = center[0]
+            steps_vert[:, :, 1] = center[1]
+            steps_vert[:, :, 2] = zbars[:, np.newaxis]
+            steps_vert[:, 0, 2] -= stair_step
+            steps_vert[:, 2, 2] -= stair_step
+            steps_vert[:, (2, 3), 0] += cos_a[:-1, np.newaxis]
+            steps_vert[:, (2, 3), 1] += sin_a[:-1, np.newaxis]
+            steps_vert[:, 5, :] = steps_vert[:, 3, :]
+            steps_vert[:, 6, 0] += cos_a[1:]
+            steps_vert[:, 6, 1] += sin_a[1:]
+            steps_poly = step_poly[np.newaxis, :, :] \
+                + (nv0 + 7 * np.arange(nsteps, dtype=np.uint32)).reshape(
+                    nsteps, 1, 1)
+            vert.assign(np.vstack((np.asarray(vert.np),
+                                   steps_vert.reshape(-1, 3))))
+            poly.assign(np.vstack((np.asarray(poly.np),
+                                   steps_poly.reshape(-1, 3))))
         well.updateNormals()
         color = self.get_alt_color(props)
         if not color:
@@ -2155,36 +2509,27 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         zscl = 1. # Z scaling of the vault ellipse
         wheight = 1.5 # straight wall height
         a0 = amax * 0.98
-        c0 = center0 + (-wp * np.cos(a0), 0, wheight)
-
-        arch = aims.AimsTimeSurface_3()
-        cyl = aims.SurfaceGenerator.cylinder(c0 + (wp, 0, -wheight),
-                                             c0 + (wp, 0, 0.07),
-                                             r0, r0, nf, False, False)
-        aims.SurfaceManip.meshMerge(arch, cyl)
-
-        for i in range(4):
-            alpha = i * amax / 4
-            alpha2 = (i + 1.07) * amax / 4
-            c1 = c0 + (wp * np.cos(alpha), 0, wp * np.sin(alpha) * zscl)
-            c2 = c0 + (wp * np.cos(alpha2), 0, wp * np.sin(alpha2) * zscl)
-            cyl = aims.SurfaceGenerator.cylinder(c1, c2, r0, r0, nf, False,
-                                                 False)
-            aims.SurfaceManip.meshMerge(arch, cyl)
-
-        c0 = center0 + (wp * np.cos(a0), 0, wheight)
-        cyl = aims.SurfaceGenerator.cylinder(c0 + (-wp, 0, -wheight),
-                                             c0 + (-wp, 0, 0.07),
-                                             r0, r0, nf, False, False)
-        aims.SurfaceManip.meshMerge(arch, cyl)
-        for i in range(4):
-            alpha = i * amax / 4
-            alpha2 = (i + 1.07) * amax / 4
-            c1 = c0 + (-wp * np.cos(alpha), 0, wp * np.sin(alpha) * zscl)
-            c2 = c0 + (-wp * np.cos(alpha2), 0, wp * np.sin(alpha2) * zscl)
-            cyl = aims.SurfaceGenerator.cylinder(c1, c2, r0, r0, nf, False,
-                                                 False)
-            aims.SurfaceManip.meshMerge(arch, cyl)
+        # both sides are symmetrical: side 1 (left), then -1 (right)
+        side = np.array([1., -1.])
+        c0 = np.array([[center0[0], center0[1], center0[2] + wheight]] * 2)
+        c0[:, 0] -= side * wp * np.cos(a0)
+        # vault segments ends, (side, segment, xyz) arrays
+        alphas = np.arange(4) * amax / 4
+        alphas2 = (np.arange(4) + 1.07) * amax / 4
+        c1 = np.repeat(c0[:, np.newaxis, :], 4, axis=1)
+        c2 = c1.copy()
+        c1[:, :, 0] += np.outer(side, wp * np.cos(alphas))
+        c1[:, :, 2] += wp * np.sin(alphas) * zscl
+        c2[:, :, 0] += np.outer(side, wp * np.cos(alphas2))
+        c2[:, :, 2] += wp * np.sin(alphas2) * zscl
+
+        # pillars, then vault segments, of each side
+        pillars = c0 + np.outer(side * wp, (1., 0., 0.))
+        points1 = np.concatenate(
+            (pillars[:, np.newaxis, :] - (0., 0., wheight), c1), axis=1)
+        points2 = np.concatenate(
+            (pillars[:, np.newaxis, :] + (0., 0., 0.07), c2), axis=1)
+        arch = self.cylinders_mesh(points1, points2, r0, nf)
 
         tmat = np.eye(4)
         tmat[:2, :2] = trans[:2, :2]
@@ -2220,8 +2565,26 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         # print(self.item_props)
 
     def clean_depth(self):
+        self.flush_depth_points()
         self.depth_maps.pop()
 
+    def add_depth_point(self, depth_mesh, point):
+        ''' Record a (x, y, z) point of a depth mesh. Points are added to the
+        mesh all at once at the end of the depth layer, in
+        :meth:`flush_depth_points`.
+        '''
+        self.pending_depth_points.setdefault(
+            id(depth_mesh), (depth_mesh, []))[1].append(point)
+
+    def flush_depth_points(self):
+        for depth_mesh, points in self.pending_depth_points.values():
+            vert = depth_mesh.vertex()
+            points = np.asarray(points, dtype=np.float32)
+            if len(vert) != 0:
+                points = np.vstack((np.asarray(vert.np), points))
+            vert.assign(points)
+        self.pending_depth_points = {}
+
     def read_depth_group(self, child_xml, trans, style=None):
         if hasattr(self, 'depth_group'):
             raise RuntimeError(
@@ -2240,7 +2603,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         z = self.depth_group.get('depth')
         if pos is not None and z is not None:
             for p in pos:
-                depth_mesh.vertex().append((p[0], p[1], -z * self.z_scale))
+                self.add_depth_point(depth_mesh,
+                                     (p[0], p[1], -z * self.z_scale))
         del self.depth_group
 
     def read_depth_arrow(self, child_xml, trans, style=None):
@@ -2260,7 +2624,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         if len(text_span) != 0:
             text = ''.join([t.text for t in text_span if t.text is not None])
             try:
-                text = re.findall('[0-9.\\-]+', text)[0]
+                text = _depth_number_re.findall(text)[0]
                 depth = float(text)
             except ValueError:
                 print('error in SVG, in depth text: found non-float value:',
@@ -2285,11 +2649,10 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                               ', in element:', child_xml.get('id'))
                         raise
                 if trans is not None:
-                    x, y = trans.dot([[x], [y], [1]])[:2]
-                    x = x[0, 0]
-                    y = y[0, 0]
+                    x, y = svg_to_mesh.transform_point_2d(trans, x, y)
                 depth_mesh = self.mesh_dict[self.main_group]
-                depth_mesh.vertex().append((x, y, -depth * self.z_scale))
+                self.add_depth_point(depth_mesh,
+                                     (x, y, -depth * self.z_scale))
 
     def read_depth_rect(self, rect_xml, trans, style=None):
         props = self.item_props  # self.group_properties.get(self.main_group)
@@ -2300,12 +2663,11 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         x = float(rect_xml.get('x'))
         y = float(rect_xml.get('y'))
         if trans is not None:
-            x, y = trans.dot([[x], [y], [1]])[:2]
-            x = x[0, 0]
-            y = y[0, 0]
-        z = -np.max((float(rect_xml.get('width')),
-                     float(rect_xml.get('height')))) * 10.
-        depth_mesh.vertex().append((x, y, z * self.z_scale))
+            x, y = svg_to_mesh.transform_point_2d(trans, x, y)
+        # (builtin max is much cheaper than np.max() on 2 floats)
+        z = max(float(rect_xml.get('width')), float(rect_xml.get('height'))) \
+            * -10. * self.z_scale
+        self.add_depth_point(depth_mesh, (x, y, z))
 
     def read_markers_map(self, filename):
         import csv
@@ -2337,10 +2699,14 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     #for item in items:
                         #row += _parse(item)
 
-                dialect = csv.Sniffer().sniff(f.read(1024))
-                f.seek(0)
-                #reader = csv.reader(f, delimiter='\t')
-                reader = csv.reader(f, dialect=dialect)
+                # the file is read only once; tab-separated files (the usual
+                # format) do not need the dialect to be sniffed
+                lines = f.read().splitlines()
+                if lines and '\t' in lines[0]:
+                    reader = csv.reader(lines, delimiter='\t')
+                else:
+                    dialect = csv.Sniffer().sniff('\n'.join(lines)[:1024])
+                    reader = csv.reader(lines, dialect=dialect)
                 for row in reader:
                     if row:
                         if len(row) == 1:  # no \t separtator
@@ -2365,7 +2731,10 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         if trans is None:
             trans = self.get_transform(xml)
         if trans is None:
-            trans = np.matrix(np.eye(3))
+            trans = np.eye(3)
+        # plain arrays are composed with elements transforms, rather than
+        # np.matrix products
+        trans_arr = np.asarray(trans)
         # print('trans:', trans)
         base_url = xml.get('markers_base_url')
         markers_map = {}
@@ -2391,6 +2760,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         used_texts = {}
         missing = []
         missing_files = []
+        # files listing of markers directories, each scanned only once
+        dir_files = self.markers_dir_files
 
         for xml_element in xml:
             level = xml_element.get('level')
@@ -2401,8 +2772,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             trans2 = xml_element.get('transform')
             trans_el = trans
             if trans2 is not None:
-                transm = self.get_transform(trans2)
-                trans_el = trans * transm
+                trans_el = trans_arr @ np.asarray(self.get_transform(trans2))
 
             radius = xml_element.get('radius')
             if radius is not None:
@@ -2416,10 +2786,10 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                 hshift = layer_hshift
 
             elements = xml_element
-            if xml_element.tag.split('}')[-1] != 'g':
+            if svg_to_mesh.tag_name(xml_element.tag) != 'g':
                 elements = [xml_element]
             for sub_el in elements:
-                tag = sub_el.tag.split('}')[-1]
+                tag = svg_to_mesh.tag_name(sub_el.tag)
                 if tag == 'text':
                     if pos is None:
                         try:
@@ -2441,8 +2811,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                                     'error while reading marker',
                                     sub_el.get('id'))
                                 raise
-                        x, y = trans_el.dot([[pos[0]], [pos[1]], [1]])[:2]
-                        pos = [x[0, 0], y[0, 0]]
+                        pos = list(svg_to_mesh.transform_point_2d(
+                            trans_el, pos[0], pos[1]))
                     if sub_el[0].text is None:
                         print('marker with no text:', sub_el.get('id'), sub_el)
                     text = sub_el[0].text.strip()
@@ -2450,8 +2820,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     trans3 = sub_el.get('transform')
                     trans_el2 = trans_el
                     if trans3 is not None:
-                        transm = self.get_transform(trans3)
-                        trans_el2 = trans_el * transm
+                        trans_el2 = np.asarray(trans_el) \
+                            @ np.asarray(self.get_transform(trans3))
                     mesh = super(CataSvgToMesh, self).read_path(sub_el,
                                                                 trans_el2,
                                                                 style)
@@ -2475,7 +2845,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                         lprops = {'type': 'directional'}
                     else:
                         try:
-                            lprops = json.loads(lprops)
+                            lprops = json_loads(lprops)
                         except Exception:
                             print('json decode error in',
                                   xml_element.get('id'))
@@ -2494,7 +2864,16 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                         # warning: only works relative to current dir
                         for image in imlist:
                             url = base_url + image
-                            if not os.path.exists(url):
+                            dirname, fname = osp.split(url)
+                            files = dir_files.get(dirname)
+                            if files is None:
+                                try:
+                                    with os.scandir(dirname or '.') as it:
+                                        files = {e.name for e in it}
+                                except OSError:
+                                    files = set()
+                                dir_files[dirname] = files
+                            if fname not in files:
                                 missing_files.append((text, pos, url))
                         used_texts.setdefault(text, []).append(pos)
                     markers.append([pos + [hshift, level, radius],
@@ -2525,24 +2904,21 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
     def read_lambert93(self, xml, trans=None):
         print('READ LAMBERT93')
         if trans is None:
-            trans = np.matrix(np.eye(3))
+            trans = np.eye(3)
         lambert_map = []
         for xml_element in xml:
-            if xml_element.tag.split('}')[-1] != 'g':
+            if svg_to_mesh.tag_name(xml_element.tag) != 'g':
                 raise ValueError('lambert93 element is not a group:',
                                  xml_element)
             text = None
             pos = None
             trans2 = xml_element.get('transform')
-            trans_el = np.matrix(np.eye(3))
+            trans_el = np.eye(3)
             if trans2 is not None:
-                transm = self.get_transform(trans2)
-                if trans is None:
-                    trans_el = transm
-                else:
-                    trans_el = trans * transm
+                trans_el = np.asarray(trans) \
+                    @ np.asarray(self.get_transform(trans2))
             for sub_el in xml_element:
-                tag = sub_el.tag.split('}')[-1]
+                tag = svg_to_mesh.tag_name(sub_el.tag)
                 if tag == 'text':
                     if pos is None:
                         pos = [float(sub_el.get('x')),
@@ -2552,8 +2928,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     trans3 = sub_el.get('transform')
                     trans_el2 = trans_el
                     if trans3 is not None:
-                        transm = self.get_transform(trans3)
-                        trans_el2 = trans_el * transm
+                        trans_el2 = np.asarray(trans_el) \
+                            @ np.asarray(self.get_transform(trans3))
                     mesh = super(CataSvgToMesh, self).read_path(sub_el,
                                                                 trans_el2,
                                                                 style=None)
@@ -2572,19 +2948,29 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                 # print('lambert93:', lambert_map[-1])
 
         self.lambert93_coords = lambert_map
-        # regress
-        from scipy import stats
-        x = [l[0][0] for l in lambert_map]
-        y = [l[1][0] for l in lambert_map]
-        lamb_x = stats.linregress(x, y)
-        x = [l[0][1] for l in lambert_map]
-        y = [l[1][1] for l in lambert_map]
-        lamb_y = stats.linregress(x, y)
+        if len(lambert_map) < 2:
+            raise ValueError('at least 2 lambert93 points are needed, got %d'
+                             % len(lambert_map))
+        # regress x and y axes (slope, intercept) in a single least squares
+        # solve: lambert_x = a * svg_x + b, lambert_y = c * svg_y + d
+        svg_xy = np.array([l[0] for l in lambert_map], dtype=np.float64)
+        lamb_xy = np.array([l[1] for l in lambert_map], dtype=np.float64)
+        n = len(lambert_map)
+        A = np.zeros((2 * n, 4))
+        A[:n, 0] = svg_xy[:, 0]
+        A[:n, 1] = 1.
+        A[n:, 2] = svg_xy[:, 1]
+        A[n:, 3] = 1.
+        params = np.linalg.lstsq(A, lamb_xy.T.ravel(), rcond=None)[0]
+        linfit = collections.namedtuple('linfit', ('slope', 'intercept'))
         class xy(object):
             pass
         self.lambert_coords = xy()
-        self.lambert_coords.x = lamb_x
-        self.lambert_coords.y = lamb_y
+        self.lambert_coords.x = linfit(params[0], params[1])
+        self.lambert_coords.y = linfit(params[2], params[3])
+        # (2, 3) affine matrix, to transform arrays of points at once
+        self.lambert_coords.matrix = np.array(
+            [[params[0], 0., params[1]], [0., params[2], params[3]]])
         # print('Lambert93 slope:', lamb_x.slope, lamb_y.slope)
         if self.lambert93_z_scaling:
             self.z_scale \
@@ -2594,12 +2980,13 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
 
     def change_level(self, mesh, dz):
         vert = mesh.vertex()
-        for v in vert:
-            v[2] += dz
+        if len(vert) != 0:
+            vert.np[:, 2] += dz
 
     @staticmethod
     def delaunay(mesh):
-        points = np.array([[p[0], p[1]] for p in mesh.vertex()])
+        points = np.array(mesh.vertex().np[:, :2], dtype=np.float64)
+        from scipy.spatial import Delaunay
         tri = Delaunay(points)
         mesh.polygon().assign(tri.simplices)
         #mesh.header()['material']['face_culling'] = 0
@@ -2659,7 +3046,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             alt_extr_filename = os.path.join(os.path.dirname(filename),
                                              'global.json')
             print('realding altidude extrema:', alt_extr_filename)
-            alt_extr = json.load(open(alt_extr_filename))
+            with open(alt_extr_filename, 'rb') as f:
+                alt_extr = json_loads(f.read())
             print('extrema:', alt_extr)
 
             scl_min = alt_extr['scale_min']
@@ -2686,12 +3074,12 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         filename:
             json map, to be used with the API module bdalti.py
         '''
-        if bdalti is None:
+        if _get_bdalti() is None:
             print('warning, bdalti module is not present')
             return
         if os.path.exists(filename):
-            with open(filename) as f:
-                self.bdalti_map = json.load(f)
+            with open(filename, 'rb') as f:
+                self.bdalti_map = json_loads(f.read())
             self.bdalti_base = os.path.dirname(filename)
         else:
             print('warning, BDAlti meta-map is not available, file %s '
@@ -2728,8 +3116,8 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             + self.lambert_coords.x.intercept
         y = pos[1] * self.lambert_coords.y.slope \
             + self.lambert_coords.y.intercept
-        z = bdalti.get_z(x, y, self.bdalti_map, self.bdalti_base,
-                         background_z=50.)
+        z = _get_bdalti().get_z(x, y, self.bdalti_map, self.bdalti_base,
+                                background_z=50.)
         return z
 
     def add_ground_alt(self, mesh, verbose=False):
@@ -2742,7 +3130,13 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                 print('->', v[2])
 
     def build_depth_wins(self, size=(1000, 1000),
-                         object_win_size=(8, 8)):
+                         object_win_size=(8, 8), rendering=False):
+        ''' Build depth maps for each level having a depth mesh.
+
+        By default depth maps are :class:`DepthMap` objects, interpolating
+        the depth meshes. If rendering is True, the depth meshes are rendered
+        in Anatomist windows instead, and depths are picked in the views.
+        '''
         self.depth_meshes = {}
         self.depth_wins = {}
 
@@ -2763,8 +3157,10 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     print('    apply relative depth:', props.relative_to)
                     dwin = self.depth_wins[props.relative_to]
                     view = dwin.view()
-                    for vertex in depth_mesh.vertex():
-                        vertex[2] += self.get_depth(vertex, view)
+                    vert = depth_mesh.vertex().np
+                    z = self.get_depths(vert, view)
+                    found = ~np.isnan(z)
+                    vert[found, 2] += z[found]
                 else:
                     # depends on another map which has not been done
                     # WARNING: infinite loops are possible. TODO: Detect them
@@ -2772,8 +3168,12 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     print('    delay depth map', level, 'which depends on',
                           props.relative_to)
                     continue
-            win, amesh = self.build_depth_win(depth_mesh, size,
-                                              object_win_size)
+            if rendering:
+                win, amesh = self.build_depth_win(depth_mesh, size,
+                                                  object_win_size)
+            else:
+                win = DepthMap(depth_mesh)
+                amesh = depth_mesh
             self.depth_meshes[level] = amesh
             self.depth_wins[level] = win
 
@@ -2784,6 +3184,11 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         if view is None:
             # surface map
             return self.ground_altitude(pos)
+        if isinstance(view, DepthMap):
+            z = view.depths([[pos[0], pos[1]]])[0]
+            if np.isnan(z):
+                return None
+            return float(z)
         pt = aims.Point3df()
         ok = view.cursorFromPosition(pos, pt)
         if verbose: print('cursorFromPosition', list(pos), ':', ok, pt.np)
@@ -2815,11 +3220,62 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         # print('get_depth: point not found:', pos, pt)
         return None
 
+    def get_depths(self, points, view, object_win_size=(8., 8.)):
+        ''' Depths for an array of points (N, 3), typically a mesh vertex
+        array (``mesh.vertex().np``). Points where the depth cannot be found
+        get a NaN value.
+        '''
+        if isinstance(view, DepthMap):
+            return view.depths(points)
+        depths = np.empty((len(points), ))
+        for i, pos in enumerate(points):
+            if view is not None:
+                pos = aims.Point3df(pos.tolist())
+            z = self.get_depth(pos, view, object_win_size)
+            depths[i] = np.nan if z is None else z
+        return depths
+
+    def get_markers_depths(self, markers, object_win_size=(8., 8.)):
+        ''' Depths of markers (as read by :meth:`read_markers`), with NaN
+        values where the depth cannot be found.
+
+        Levels are mapped to integer ids, and the depths of all markers of a
+        level are queried at once.
+        '''
+        level_ids = {}
+        level_id = np.array([level_ids.setdefault(mpos[0][3], len(level_ids))
+                             for mpos in markers], dtype=np.int16)
+        points = np.zeros((len(markers), 3))
+        if markers:
+            points[:, :2] = [mpos[0][:2] for mpos in markers]
+        depths = np.empty((len(markers), ))
+        for level, lid in level_ids.items():
+            mask = (level_id == lid)
+            depths[mask] = self.get_depths(
+                points[mask], self.depth_wins[level].view(), object_win_size)
+        return depths
+
     def get_alt_color(self, props, colorset=None, conv=True, get_bg=True):
+        ''' Alternative color of an item in the given colorset (or its
+        inherited ones).
+
+        Results are cached: they only depend on the item label and colors
+        dicts, which are shared between items (see :func:`json_prop`). Cache
+        entries keep a reference to these dicts so that their ids stay valid.
+        Colors are cached as immutable values, and each call returns a new
+        list (or dict), which callers may modify.
+        '''
         if props is None:
             return None
         if colorset is None:
             colorset = self.colorset
+        alt_colors = props.alt_colors
+        label_alt_colors = props.label_alt_colors
+        key = (id(alt_colors), id(label_alt_colors), props.label, colorset,
+               conv, get_bg)
+        cached = self.alt_color_cache.get(key)
+        if cached is not None:
+            return _thawed_color(cached[2])
         col = None
         while col is None and colorset:
             col = self.get_alt_color_s(props, colorset, conv)
@@ -2831,7 +3287,9 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                 bg = col.get('fg')
             if bg is not None:
                 col = bg
-        return col
+        self.alt_color_cache[key] = (alt_colors, label_alt_colors,
+                                     _frozen_color(col))
+        return _thawed_color(self.alt_color_cache[key][2])
 
     def get_alt_colors(self, props, colorset=None, conv=True):
         ''' Get backgroud, foreground colors (fill/border)
@@ -2863,10 +3321,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
 
         def convert_color(color):
             if isinstance(color, str) and color.startswith('#'):
-                c1 = color[1::2]
-                c2 = color[2::2]
-                col = [float(int('%s%s' % (x, y), base=16)) / 255. for x, y in
-                       zip(c1, c2)]
+                col = list(hex_color(color))
                 # print('alt color:', props.main_group, col)
                 return col
             try:
@@ -2927,17 +3382,18 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                         material['diffuse'] = alt_colors[0]
                     if alt_colors[1] is not None:
                         material['border_color'] = alt_colors[1]
-                    for v in mesh.vertex():
-                        if np.isnan(v[0]):
-                            print('NAN in mesh:', mesh.vertex().np)
-                        z = self.get_depth(v, view, object_win_size)
-                        if z is not None:
-                            v[2] += z  # + hshift  # done via transform_3d
-                        else:
-                            failed += 1
-                            if debug:
-                                print('missed Z:', v)
-                    done += len(mesh.vertex())
+                    vert = mesh.vertex().np
+                    if np.any(np.isnan(vert[:, 0])):
+                        print('NAN in mesh:', vert)
+                    z = self.get_depths(vert, view, object_win_size)
+                    found = ~np.isnan(z)
+                    # + hshift  # done via transform_3d
+                    vert[found, 2] += z[found]
+                    nfound = np.count_nonzero(found)
+                    failed += len(vert) - nfound
+                    if debug and nfound != len(vert):
+                        print('missed Z:', vert[~found])
+                    done += len(vert)
                 if failed != 0:
                     print('failed:', failed, '/', done)
                     if float(failed) / done >= 0.2:
@@ -3001,22 +3457,23 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             text_view = text_win.view()
 
         # print('ARROW DEPTH for', props)
-        for v in mesh.vertex():
-            z = self.get_depth(v, view, object_win_size)
-            if z is not None:
-                z += hshift
-                old_z = v[2]  # old_z is a weight between text and z
-                text_z = self.get_depth(v, text_view, object_win_size)
-                if text_z is None:
-                    text_z = 0.
-                text_z += text_hshift
-                new_z = z * old_z + text_z * (1. - old_z)
-                # print('w:', old_z, ', t: ', text_z, ', a:', z, ':', new_z)
-                v[2] = new_z
-            else:
-                pass  # warn ?
+        vert = mesh.vertex().np
+        z = self.get_depths(vert, view, object_win_size)
+        found = ~np.isnan(z)  # warn for others ?
+        z = z[found] + hshift
+        text_z = self.get_depths(vert[found], text_view, object_win_size)
+        text_z[np.isnan(text_z)] = 0.
+        text_z += text_hshift
+        old_z = vert[found, 2]  # old_z is a weight between text and z
+        vert[found, 2] = z * old_z + text_z * (1. - old_z)
 
     def build_wells_with_depths(self, meshes):
+        ''' Build the wells meshes of each wells group from their specs, at
+        their depths, and concatenate them in a single mesh per group.
+
+        Wells are generated sequentially: the make_* methods need the
+        converter state, which cannot be pickled to worker processes.
+        '''
 
         views = {level: win.view() for level, win in self.depth_wins.items()}
 
@@ -3037,7 +3494,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                 view = views.get(level)
                 view_up = views.get(next_level)
 
-                wells = None
+                wells = []
                 for ws in specs:
                     try:
                         center, radius, z, height = ws
@@ -3063,16 +3520,18 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                     pheight = props.height
                     if pheight is None:
                         pheight = 0.
-                    well = method(center, radius,
-                                  z + shift * self.z_scale,
-                                  height + pheight * self.z_scale,
-                                  well_type=None,
-                                  props=props)
-                    if wells is None:
-                        wells = well
-                    else:
-                        aims.SurfaceManip.meshMerge(wells, well)
-                meshes[main_group + '_tri'] = wells
+                    wells.append(method(center, radius,
+                                        z + shift * self.z_scale,
+                                        height + pheight * self.z_scale,
+                                        well_type=None,
+                                        props=props))
+                # all wells of the group are concatenated at once, rather
+                # than merged one after the other
+                well = wells[0]
+                if len(wells) > 1:
+                    well = self.merged_meshes(wells)
+                    well.header().update(wells[0].header())
+                meshes[main_group + '_tri'] = well
                 self.group_properties[main_group + '_tri'] = props
 
     def tesselate(self, mesh, flat=False):
@@ -3562,46 +4021,39 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         # sounds and photos depth + markers meshes
         object_win_size = [8, 8]
 
-        protos = getattr(self, 'marker_types', {})
+        protos = self.marker_types
 
         for mtype, proto in protos.items():
             mesh = None
+            markers = getattr(self, mtype)
+            depths = self.get_markers_depths(markers, object_win_size)
             if mtype == 'lights':
                 mesh_proto = None
-                for mpos in getattr(self, mtype):
+                for mpos, z in zip(markers, depths):
                     pos = mpos[0][:4]
                     props = mpos[0][4]
                     hshift = pos[2]
                     level = pos[3]
-                    win = self.depth_wins[level]
-                    z = self.get_depth(pos[:2] + [0.], win.view(),
-                                       object_win_size)
-                    if z is None:
+                    if np.isnan(z):
                         print('failed to get depth for:', mtype, pos, level)
                         z = 0.
-                    mpos[0][2] = z + hshift
+                    mpos[0][2] = float(z) + hshift
             else:
-                mesh_proto = getattr(self, proto)
+                mesh_proto = self.symbol_model(proto)
                 print(mtype, 'proto:', len(mesh_proto.vertex()))
-                for mpos in getattr(self, mtype):
+                for mpos, z in zip(markers, depths):
                     pos = mpos[0][:4]
                     hshift = pos[2]
                     # radius = mpos[0][4]
                     level = pos[3]
-                    win = self.depth_wins[level]
-                    z = self.get_depth(pos[:2] + [0.], win.view(),
-                                       object_win_size)
-                    if z is None:
+                    if np.isnan(z):
                         print('failed to get depth for:', mtype, pos, level)
                         z = 0.
-                    z += hshift
+                    z = float(z) + hshift
                     mpos[0][2] = z
                     pos[2] = z
                     # print('marker:', level, pos)
-                    mmesh = type(mesh_proto)(mesh_proto)  # copy
-                    trans = aims.AffineTransformation3d()
-                    trans.setTranslation(pos[:3])
-                    aims.SurfaceManip.meshTransform(mmesh, trans)
+                    mmesh = self.translated_mesh(mesh_proto, pos[:3])
                     if mesh is None:
                         mesh = mmesh
                     else:
@@ -3654,13 +4106,12 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         up = aims.AimsTimeSurface(mesh)
         object_win_size = (2., 2.)
 
-        for v in up.vertex():
-            z = self.get_depth(v, view, object_win_size)
-            if z is None:
-                v[2] += distance  # fallback to default
-            else:
-                # we inverse (again) because depth maps are already inverted
-                v[2] -= z
+        vert = up.vertex().np
+        z = self.get_depths(vert, view, object_win_size)
+        missing = np.isnan(z)
+        # we inverse (again) because depth maps are already inverted
+        vert[~missing, 2] -= z[~missing]
+        vert[missing, 2] += distance  # fallback to default
 
         walls = aims.AimsTimeSurface(3)
         walls.header().update(
@@ -3676,11 +4127,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         poly = walls.polygon()
 
         vert.assign(vert0 + up.vertex())
-        nv = len(vert0)
-
-        for line in poly0:
-            poly.append((line[0], line[1], nv + line[0]))
-            poly.append((line[1], nv + line[1], nv + line[0]))
+        poly.assign(self.wall_triangles(poly0, len(vert0)))
 
         walls.updateNormals()
 
@@ -3814,7 +4261,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
                for j in range(grid.shape[0] - 1)
                for i in range(grid.shape[1])]
         mesh = aims.AimsTimeSurface_2()
-        mesh.vertex().assign(grid_v)
+        mesh.vertex().assign(grid_v.astype(np.float32))
         mesh.polygon().assign(grid_s)
         mesh.header()['material'] = {'diffuse': [0.9, 0.9, 0.9, 1.]}
         self.ground_grid = mesh
@@ -4126,7 +4573,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
         sys.path.insert(0, p)
         try:
             import build_version
-            imp.reload(build_version)
+            importlib.reload(build_version)
             # increment build version
             build_version.build_version += 1
             # save modified build version
@@ -4385,7 +4832,7 @@ class CataSvgToMesh(svg_to_mesh.SvgToMesh):
             json_obj['camera_light'] = cam_light
         def_cat = metadata.get('default_categories')
         if def_cat is not None:
-            def_cat = json.loads(def_cat)
+            def_cat = json_loads(def_cat)
             json_obj['default_categories'] = def_cat
 
         travel_speed = getattr(self, 'travel_speed_projection', None)
@@ -4411,6 +4858,8 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
 
     def __init__(self, concat_mesh='bygroup'):
         super(CataMapTo2DMap, self).__init__(concat_mesh)
+        # results of the filters applied in the last build_2d_map()
+        self.results = []
 
     def find_protos(self, xml):
         root = xml.getroot()
@@ -4510,7 +4959,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
         todo = [xml.getroot()]
 
         while todo:
-            element = todo.pop(0)
+            element = todo.pop()
             map_trans = element.get('map_transform')
             if map_trans is not None:
                 trans = element.get('transform')
@@ -4520,8 +4969,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                     trans = map_trans + ' ' + trans
                 element.set('transform', trans)
 
-            added = element[:]
-            todo = added + todo
+            todo += reversed(element[:])
 
     def shadow1(self, filter_id):
         f = ET.Element('{http://www.w3.org/2000/svg}filter')
@@ -4839,42 +5287,53 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                              CataMapTo2DMap.roman(date.year))
 
     @staticmethod
-    def in_region(pt, region, bbox, verbose=False):
-        x = pt[0]
-        y = pt[1]
+    def points_in_region(pts, region, bbox):
+        ''' Vectorized version of :meth:`in_region` for an array of points
+        (N, 2). Returns an array of N booleans.
+        '''
+        pts = np.asarray(pts, dtype=np.float64)
+        x = pts[:, 0]
+        y = pts[:, 1]
         # bbox is used first to quickly discard points
-        if bbox is not None and (x < bbox[0][0] or x > bbox[1][0]
-                                 or y < bbox[0][1] or y > bbox[1][1]):
-            return False
-        if region is None:
-            return True
-        # then check clip region polygon more thoroughfully
-        if verbose:
-            print('in_region check polygon:', pt, bbox)
-        lines = region.polygon()
-        vert = region.vertex()
-        left_pts = 0
-        for l in lines:
-            # intersects with horizontal line on pt
-            intersect = ((vert[l[0]][1] - y) * (vert[l[1]][1] - y) <= 0)
-            if not intersect:
-                continue
-            # intersect abscissa
-            v = vert[l[1]] - vert[l[0]]
-            h = (y - vert[l[0]][1]) / v[1]
-            xi = vert[l[0]][0] + h * v[0]
-            if xi == x:
-                # just on border: in
-                if verbose:
-                    print('__in__')
-                return True
-            elif xi < x:
-                left_pts += 1
+        if bbox is None:
+            inside = np.ones(len(pts), dtype=bool)
+        else:
+            inside = ~((x < bbox[0][0]) | (x > bbox[1][0])
+                       | (y < bbox[0][1]) | (y > bbox[1][1]))
+        if region is None or not np.any(inside):
+            return inside
+        # then check clip region polygon more thoroughfully, for all
+        # remaining points x all segments at once
+        idx = np.nonzero(inside)[0]
+        x = x[idx, np.newaxis]
+        y = y[idx, np.newaxis]
+        lines = np.asarray(region.polygon().np)
+        vert = np.asarray(region.vertex().np)
+        p0 = vert[lines[:, 0]]
+        p1 = vert[lines[:, 1]]
+        # segments which intersect with the horizontal line on each point
+        intersect = ((p0[:, 1] - y) * (p1[:, 1] - y) <= 0)
+        v = p1 - p0
+        # intersect abscissa
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xi = p0[:, 0] + (y - p0[:, 1]) / v[:, 1] * v[:, 0]
+        # just on border: in
+        on_border = np.any(intersect & (xi == x), axis=1)
+        left_pts = np.count_nonzero(intersect & (xi < x), axis=1)
         # odd nb of intersections on the left (and right): in
         # even: out
+        inside[idx] = on_border | (left_pts & 1 == 1)
+        return inside
+
+    @staticmethod
+    def in_region(pt, region, bbox, verbose=False):
+        if verbose:
+            print('in_region check:', pt, bbox)
+        inside = bool(CataMapTo2DMap.points_in_region([pt[:2]], region,
+                                                      bbox)[0])
         if verbose:
-            print('__', (left_pts & 1 == 1), '__', left_pts)
-        return (left_pts & 1 == 1)
+            print('__', inside, '__')
+        return inside
 
     @staticmethod
     def box_in_region(box, region, bbox, verbose=False):
@@ -4893,8 +5352,8 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                (box[0][0], box[1][1]),
                (box[1][0], box[0][1]),
                (box[1][0], box[1][1])]
-        nin = sum([int(CataMapTo2DMap.in_region(pt, region, bbox))
-                   for pt in pts])
+        nin = int(np.count_nonzero(
+            CataMapTo2DMap.points_in_region(pts, region, bbox)))
         if verbose:
             print('box_in_region:', box, bbox, nin)
         if nin == 0:
@@ -4904,8 +5363,23 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
         else:
             return 0
 
+    @staticmethod
+    def is_rect_region(region):
+        ''' check if a region mesh is an axis-aligned rectangle (4 distinct
+        vertices, horizontal or vertical segments). Its bounding box is then
+        exactly the region, and points and boxes can be tested against it
+        without the polygon test.
+        '''
+        vert = np.asarray(region.vertex().np)[:, :2]
+        lines = np.asarray(region.polygon().np)
+        if len(lines) < 4 or len(np.unique(vert, axis=0)) != 4:
+            return False
+        v = vert[lines[:, 1]] - vert[lines[:, 0]]
+        return bool(np.all((v[:, 0] == 0) | (v[:, 1] == 0)))
+
     def clip_and_scale(self, layer, target_layer, trans, region, region_bbox,
-                       src_trans=None, with_copy=False, verbose=False):
+                       src_trans=None, with_copy=False, verbose=False,
+                       region_is_rect=False):
         # verbose = verbose or ((layer.get('id') == 'layer8') and target_layer.get('id') == 'layer81')
         if verbose:
             print('clip_and_scale:', layer.tag, layer.get('id'), 'into:',
@@ -4922,6 +5396,8 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
         to_remove = []
         # to_add = []
         copied = []
+        # for a rectangular region the bbox test is exact
+        test_region = None if region_is_rect else region
         for index, element in enumerate(layer):
             if with_copy:
                 element = copy.deepcopy(element)
@@ -4930,7 +5406,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             bbox = self.boundingbox(element, src_trans)
             # print('bbox:', bbox)
             if bbox != [None, None]:
-                in_out = self.box_in_region(bbox, region, region_bbox,
+                in_out = self.box_in_region(bbox, test_region, region_bbox,
                                             verbose=verbose)
                 if in_out <= 0:
                     if verbose:
@@ -4944,7 +5420,8 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                         # group: look inside
                         self.clip_and_scale(element, element, trans, region,
                                             region_bbox, src_trans,
-                                            verbose=verbose)
+                                            verbose=verbose,
+                                            region_is_rect=region_is_rect)
                     else:
                         # real object intersect
                         remove = True
@@ -4997,7 +5474,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                     p = trans2 * np.expand_dims([x, y, 1.], 1)
                     x, y = p[0, 0], p[1, 0]
                 # print('tag:', element.tag, x, y)
-                if not self.in_region((x, y), region, region_bbox,
+                if not self.in_region((x, y), test_region, region_bbox,
                                       verbose=verbose):
                     # print('remove from:', target_layer, target_layer.get('id'))
                     to_remove.append(element)
@@ -5062,6 +5539,11 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
         target_layer.remove(target_rect)
 
         clip_region = self.read_path(mask_layer[0], trans)
+        region_is_rect = self.is_rect_region(clip_region)
+        if region_is_rect:
+            vert = np.asarray(clip_region.vertex().np)
+            in_rect = [vert[:, :2].min(axis=0).tolist(),
+                       vert[:, :2].max(axis=0).tolist()]
 
         for layer in xml.getroot():
             if not layer.tag.endswith('}g'):
@@ -5077,7 +5559,8 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             if hidden or label is None:
                 continue
             self.clip_and_scale(layer, target_layer, enl_tr, clip_region,
-                                in_rect, None, with_copy=True)
+                                in_rect, None, with_copy=True,
+                                region_is_rect=region_is_rect)
         # print('in_rect:', in_rect)
         # print(np.asarray(clip_region.vertex()))
 
@@ -5114,7 +5597,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             non_visibility = layer.get('non_visibility')
             if non_visibility:
                 if non_visibility.strip().startswith('['):
-                    non_visibility = json.loads(non_visibility)
+                    non_visibility = json_loads(non_visibility)
                 else:
                     non_visibility = [non_visibility]
                 if self.map_name in non_visibility:
@@ -5125,7 +5608,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             if visibility is None:
                 continue
             elif visibility.strip().startswith('['):
-                visibility = json.loads(visibility)
+                visibility = json_loads(visibility)
             else:
                 if visibility == 'private':  # old style
                     # exception, here 'private' is not a map type name but a
@@ -5378,7 +5861,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             meta = meta[0]
             shift_txt = meta.get('text_shadow_shift')
             if shift_txt:
-                shift = json.loads(shift_txt)
+                shift = json_loads(shift_txt)
 
         for layer in xml2.getroot():
             trans = None
@@ -5428,7 +5911,8 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                 break
             insert_pos += 1
 
-        for layer in xml2.getroot():
+        # iterate over a copy: with lxml, inserting moves the layer out of xml2
+        for layer in xml2.getroot()[:]:
             if layer.tag == '{http://www.w3.org/2000/svg}g':
                 xml.getroot().insert(insert_pos, layer)
                 insert_pos += 1
@@ -5455,7 +5939,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                 meta = meta[0]
                 colorset_inheritance = meta.get('colorset_inheritance')
                 if colorset_inheritance:
-                    colorset_inheritance = json.loads(colorset_inheritance)
+                    colorset_inheritance = json_loads(colorset_inheritance)
                     self.colorset_inheritance = colorset_inheritance
 
         for layer in xml.getroot():
@@ -5515,11 +5999,10 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
 
         # recolor legend items
         if legend_layer:
-            todo = legend_layer[:]
-            while todo:
-                item = todo.pop(0)
-                if len(item) != 0:
-                    todo += item[:]
+            # (styles are only modified: the C-level iterator can be used)
+            for item in legend_layer.iter():
+                if item is legend_layer:
+                    continue
                 label = item.get('label')
                 if not label:
                     continue
@@ -5548,27 +6031,23 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
 
     def list_colorsets(self, xml):
         colorsets = set()
-        todo = [xml.getroot()]
-        while todo:
-            item = todo.pop()
+        for item in xml.getroot().iter():
             alt_col = item.get('alt_colors')
             if alt_col:
                 try:
-                    alt_col = json.loads(alt_col)
+                    alt_col = json_prop(alt_col)
                 except Exception:
                     raise
                 colorsets.update(alt_col.keys())
             label_alt_col = item.get('label_alt_colors')
             if label_alt_col:
                 try:
-                    label_alt_col = json.loads(label_alt_col)
+                    label_alt_col = json_prop(label_alt_col)
                 except Exception:
                     raise
                 for c in label_alt_col.values():
                     colorsets.update(c.keys())
 
-            todo += item[:]
-
         print('available colorsets:')
         for col in sorted(colorsets):
             print('    %s' % col)
@@ -5685,7 +6164,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             replacements = {'col_filter': col_filter,
                             'colorset': colorset}
             user_map_defs % replacements
-            user_map_defs = json.loads(user_map_defs)
+            user_map_defs = json_loads(user_map_defs)
             maps_def.update(user_map_defs)
 
         return maps_def
@@ -5835,7 +6314,11 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
         maps = []
         root = xml.getroot()
         for i in range(len(layers)):
-            mr = ET.Element(root.tag)
+            if hasattr(root, 'nsmap'):
+                # lxml: keep the namespace prefixes of the source document
+                mr = ET.Element(root.tag, nsmap=root.nsmap)
+            else:
+                mr = ET.Element(root.tag)
             m = ET.ElementTree(mr)
             for k, v in root.items():
                 mr.set(k, v)
@@ -5889,7 +6372,9 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                 xml = mapi
                 self.xml = xml
                 continue
-            for layer in mapi.getroot():
+            # iterate over a copy: with lxml, inserting moves the layer out of
+            # mapi
+            for layer in mapi.getroot()[:]:
                 if layer.tag != '{http://www.w3.org/2000/svg}g':
                     continue
                 layer_num = int(layer.get('layer_num'))
@@ -5934,7 +6419,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
                 continue
             lay_op = layer.get('map_opacity')
             if lay_op:
-                lay_op = json.loads(lay_op.strip())
+                lay_op = json_loads(lay_op.strip())
                 if self.map_name in lay_op:
                     opacity = lay_op[self.map_name]
                     style = self.get_style(layer)
@@ -6073,7 +6558,7 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
         if meta is not None and len(recolor) == 0:
             colorsets = meta.get('colorsets')
             if colorsets:
-                colorsets = json.loads(colorsets)
+                colorsets = json_loads(colorsets)
                 def_colorset = colorsets.get(map_name)
                 # TODO: remove the exception here:
                 if def_colorset:  # and not map_name.startswith('igc'):
@@ -6117,7 +6602,9 @@ class CataMapTo2DMap(svg_to_mesh.SvgToMesh):
             else:
                 filters = filt_def + filters
 
-        self.xml.result = results
+        # filters results are kept on the converter: lxml trees do not accept
+        # new attributes
+        self.results = results
         print('build_2d_map done.')
         return self.xml
 
@@ -6143,7 +6630,7 @@ def get_inkscape_ub16():
         if pwd.startswith(os.path.realpath(os.environ.get('HOME'))):
             pwd = pwd.replace(os.path.realpath(os.environ.get('HOME')),
                               os.environ.get('HOME'))
-        casa_distro = distutils.spawn.find_executable('casa_distro')
+        casa_distro = shutil.which('casa_distro')
         if not casa_distro:
             return inkscape_ub16
         dist = subprocess.check_output(['casa_distro', 'list'])
@@ -6183,6 +6670,132 @@ def inkscape_version(inkscape_exe='inkscape'):
     return ver
 
 
+class InkscapeShell(object):
+    ''' Persistent ``inkscape --shell`` session, used to export several
+    images without paying the Inkscape startup time for each of them.
+
+    Use it as a context manager::
+
+        with InkscapeShell() as shell:
+            export_png('map_public.svg', 360, 'clip_rect', shell=shell)
+
+    Only Inkscape 1.x actions are supported. With older versions, or if
+    Inkscape cannot be started, the shell stays inactive and
+    :func:`export_png` runs a separate inkscape command as before. If the
+    shell does not answer within ``timeout`` seconds, it is killed, and
+    exports also fall back to the separate command.
+    '''
+
+    prompt = b'> '
+
+    def __init__(self, inkscape_exe='inkscape', timeout=1800.):
+        if not isinstance(inkscape_exe, (tuple, list)):
+            inkscape_exe = [inkscape_exe]
+        self.inkscape_exe = list(inkscape_exe)
+        self.timeout = timeout
+        self.process = None
+        self.export_id = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def active(self):
+        return self.process is not None
+
+    def start(self):
+        try:
+            if inkscape_version(self.inkscape_exe)[0] < 1:
+                return
+            self.process = subprocess.Popen(
+                self.inkscape_exe + ['--shell'], stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE)
+            self.wait_prompt()
+        except (OSError, subprocess.CalledProcessError, RuntimeError):
+            self.kill()
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.write(b'quit\n')
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.export_id = None
+
+    def kill(self):
+        ''' Stop the shell without waiting for it to answer
+        '''
+        if self.process is None:
+            return
+        self.process.kill()
+        self.process.wait()
+        self.process = None
+        self.export_id = None
+
+    def wait_prompt(self):
+        ''' Read the shell output until its prompt, at the start of a line.
+        Raises RuntimeError if the shell terminates, or does not answer
+        within ``self.timeout`` seconds.
+        '''
+        fd = self.process.stdout.fileno()
+        output = b''
+        deadline = time.monotonic() + self.timeout
+        while output != self.prompt \
+                and not output.endswith(b'\n' + self.prompt):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 \
+                    or not select.select([fd], [], [], remaining)[0]:
+                raise RuntimeError('inkscape shell does not answer')
+            c = os.read(fd, 4096)
+            if not c:
+                raise RuntimeError('inkscape shell has terminated')
+            output += c
+        return output
+
+    def run(self, actions):
+        ''' Send a list of actions, as a single command line, and wait for
+        them to complete
+        '''
+        self.process.stdin.write(('; '.join(actions) + '\n').encode())
+        self.process.stdin.flush()
+        return self.wait_prompt()
+
+    def export_png(self, in_file, out_file, resolution=180, rect_id=None):
+        if rect_id is None and self.export_id is not None:
+            # export options persist in the session, and there is no action
+            # to unset the exported object: restart a clean shell.
+            self.close()
+            self.start()
+            if not self.active():
+                return False
+        actions = ['file-open:%s' % in_file,
+                   'export-type:png',
+                   'export-dpi:%s' % str(resolution),
+                   'export-filename:%s' % out_file]
+        if rect_id:
+            actions.append('export-id:%s' % rect_id)
+            self.export_id = rect_id
+        actions += ['export-do', 'file-close']
+        try:
+            self.run(actions)
+        except (OSError, RuntimeError) as e:
+            print('inkscape shell failed:', e)
+            self.kill()
+            return False
+        return True
+
+
 def export_pdf(in_file, out_file=None):
     inkscape_exe = ['inkscape']
     iver = inkscape_version()
@@ -6210,7 +6823,18 @@ def export_pdf(in_file, out_file=None):
 
 
 def export_png(in_file, resolution=180, rect_id=None, out_file=None,
-               ignore_errors=False):
+               ignore_errors=False, shell=None):
+    if not out_file:
+        out_file = in_file.replace('.svg', '.png')
+    if shell is not None and shell.active():
+        print('png export in inkscape shell:', out_file)
+        if os.path.exists(out_file):
+            os.unlink(out_file)
+        if shell.export_png(in_file, out_file, resolution, rect_id):
+            if not os.path.exists(out_file) and not ignore_errors:
+                raise RuntimeError('inkscape could not export %s' % out_file)
+            return
+
     inkscape_exe = ['inkscape']
     iver = inkscape_version()
     #if iver[0] == 1:
@@ -6219,8 +6843,6 @@ def export_png(in_file, resolution=180, rect_id=None, out_file=None,
         #inkscape_exe = get_inkscape_ub16()
         #iver = inkscape_version(inkscape_exe)
     print('png export exe:', inkscape_exe, ', version:', iver)
-    if not out_file:
-        out_file = in_file.replace('.svg', '.png')
     if ignore_errors:
         call = subprocess.call
     else:
@@ -6244,26 +6866,22 @@ def export_png(in_file, resolution=180, rect_id=None, out_file=None,
 
 def convert_to_format(png_file, format='jpg', remove=True, max_pixels=None):
     outfile = png_file.replace('.png', '.%s' % format)
-    if PIL:
+    pil_image = _get_pil_image()
+    if pil_image:
         # use Pillow PIL module
         if not max_pixels:
             max_pixels = 30000 * 30000  # large enough
-        PIL.Image.MAX_IMAGE_PIXELS = max_pixels
+        pil_image.MAX_IMAGE_PIXELS = max_pixels
         try:
-            with PIL.Image.open(png_file) as im:
+            with pil_image.open(png_file) as im:
                 if format == 'jpg':
-                    # convert to RGB with alpha and white background
-                    front = np.array(im)  # copy because the image in read only
-                    for i in range(3):
-                        alpha = front[:, :, 3]  # uint8
-                        front[:, :, i] = (
-                            (255 - alpha)
-                            + (front[:, :, i].astype(np.float32)
-                               * alpha / 255).astype(np.uint8))
-                    front[:, :, 3] = 255
-
-                    im = PIL.Image.fromarray(front, 'RGBA')
-                    im = im.convert(mode='RGB')
+                    # convert to RGB with alpha and white background.
+                    # paste() blends in C, without full-size numpy copies
+                    if im.mode != 'RGBA':
+                        im = im.convert(mode='RGBA')
+                    back = pil_image.new('RGB', im.size, (255, 255, 255))
+                    back.paste(im, mask=im.getchannel('A'))
+                    im = back
 
                 save_options = {}
                 if format == 'tif':
@@ -6296,12 +6914,13 @@ def convert_to_format(png_file, format='jpg', remove=True, max_pixels=None):
 
 
 def build_2d_map(xml_et, out_filename, map_name, filters, clip_rect,
-                 dpi, shadows=True, do_pdf=False, do_jpg=True, georef=None):
+                 dpi, shadows=True, do_pdf=False, do_jpg=True, georef=None,
+                 inkscape_shell=None):
     svg2d = CataMapTo2DMap()
 
     meta = svg2d.get_metadata(xml_et)
     main_clip_rects = meta.get('main_clip_rect_id', '{}')
-    main_clip_rects = json.loads(main_clip_rects)
+    main_clip_rects = json_loads(main_clip_rects)
     main_clip_rect = main_clip_rects.get('default')
     if not clip_rect:
         clip_rect = main_clip_rects.get(map_name)
@@ -6356,7 +6975,7 @@ def build_2d_map(xml_et, out_filename, map_name, filters, clip_rect,
     hpix = height * float(dpi) / 25.4
     print('in pixels:', wpix, hpix)
     export_png(out_filename.replace('.svg', '_%s.svg' % map_name),
-               dpi, clip_rect)
+               dpi, clip_rect, shell=inkscape_shell)
     if do_pdf:
         export_pdf(out_filename.replace('.svg', '_%s_flat.svg' % map_name))
         # TODO: add scaling
@@ -6388,6 +7007,27 @@ def build_2d_map(xml_et, out_filename, map_name, filters, clip_rect,
         print('geolocalization info copied.')
 
 
+_job_xml_et = None
+
+
+def _init_2d_map_job(xml_data):
+    ''' process pool initializer for :func:`build_2d_map` jobs: the SVG tree
+    is rebuilt from its serialized form (it cannot be pickled with lxml), once
+    per worker process. Jobs only read it (maps are built on a copy).
+    '''
+    global _job_xml_et
+    _job_xml_et = ET.ElementTree(ET.fromstring(xml_data,
+                                               svg_to_mesh.xml_parser))
+
+
+def _build_2d_map_job(out_filename, map_kw):
+    ''' process pool job for :func:`build_2d_map`
+    '''
+    with InkscapeShell() as inkscape_shell:
+        build_2d_map(_job_xml_et, out_filename,
+                     inkscape_shell=inkscape_shell, **map_kw)
+
+
 def scale_georef_points_file(in_filename, out_filename, scale_factor_x,
                              scale_factor_y=None):
     ''' Rescale source positions in a QGis .points file in order to adapt
@@ -6543,6 +7183,12 @@ The program allows to produce:
         '-g', '--georef',
         help='Copy GeoTIFF information from the given source file to a .tif '
         'export')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='number of 2D maps built in parallel, in separate processes '
+        '(default: 1, maps are built one after the other; 0: one per map, '
+        'up to the number of CPUs). Each process holds its own copy of the '
+        'map in memory and runs its own Inkscape.')
     parser.add_argument(
         '--texture', action='store_true', default=None,
         help='make textured meshes in 3D mode, if some are specified in the '
@@ -6652,6 +7298,7 @@ The program allows to produce:
         do_2d_maps = set(do_2d_maps.split(','))
         print('build 2D maps:', do_2d_maps)
 
+        maps_kw = []
         for map_type in do_2d_maps:
             map_def = dict(maps_def[map_type])
             if clip_rect:
@@ -6662,9 +7309,7 @@ The program allows to produce:
             if georef:
                 # don't write jpg, we will use tiff
                 map_def['do_jpg'] = False
-            build_2d_map(
-                xml_et,
-                out_filename,
+            maps_kw.append(dict(
                 map_name=map_def['name'],
                 filters=map_def['filters'],
                 clip_rect=map_def.get('clip_rect'),
@@ -6672,13 +7317,38 @@ The program allows to produce:
                 shadows=map_def['shadows'],
                 do_pdf=map_def['do_pdf'],
                 do_jpg=map_def.get('do_jpg', True),
-                georef=georef)
+                georef=georef))
+
+        njobs = options.jobs
+        if not njobs:
+            njobs = os.cpu_count() or 1
+        njobs = min(njobs, len(maps_kw))
+        if njobs <= 1:
+            # a single inkscape process renders all maps
+            with InkscapeShell() as inkscape_shell:
+                for map_kw in maps_kw:
+                    build_2d_map(xml_et, out_filename,
+                                 inkscape_shell=inkscape_shell, **map_kw)
+        else:
+            # maps are independent: build them in parallel. Workers are
+            # spawned, not forked, since Anatomist / Qt may already be
+            # running in this process (3D mode).
+            xml_data = ET.tostring(xml_et.getroot())
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=njobs, initializer=_init_2d_map_job,
+                    initargs=(xml_data, ),
+                    mp_context=multiprocessing.get_context('spawn')) \
+                    as executor:
+                jobs = [executor.submit(_build_2d_map_job, out_filename,
+                                        map_kw)
+                        for map_kw in maps_kw]
+                for job in jobs:
+                    job.result()
 
     if do_split:
         svg2d = CataMapTo2DMap()
-        map2d_split = svg2d.build_2d_map(
-            xml_et, filters=['split_layers="default"'])
-        for i, m in enumerate(map2d_split.result[-1]):
+        svg2d.build_2d_map(xml_et, filters=['split_layers="default"'])
+        for i, m in enumerate(svg2d.results[-1]):
             m.write(out_filename.replace('.svg', '_%d.svg' % i))
 
     if do_join:
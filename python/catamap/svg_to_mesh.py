@@ -9,7 +9,18 @@ svg_to_mesh module API
 ----------------------
 '''
 
-import xml.etree.cElementTree as ET
+try:
+    from lxml import etree as ET
+    # comments and processing instructions would show up as children with
+    # non-string tags: drop them at parse time. Elements are never looked up
+    # by ID through libxml2, so its ID hash table is not built.
+    xml_parser = ET.XMLParser(huge_tree=True, remove_comments=True,
+                              remove_pis=True, collect_ids=False)
+except ImportError:
+    # the C accelerator (_elementtree) is used transparently;
+    # cElementTree was removed in python 3.9
+    import xml.etree.ElementTree as ET
+    xml_parser = None
 try:
     from soma import aims, aimsalgo
     fake_aims = False
@@ -26,6 +37,14 @@ import copy
 import sys
 import math
 import json
+try:
+    # faster JSON decoding of element properties when available
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+import functools
+import re
 
 '''
 SVG parsing as mesh objects
@@ -37,6 +56,7 @@ requires:
 * scipy
 * optionally, soma.aims
 * optionally, pyclipper
+* optionally, orjson
 
 aims:
 
@@ -53,8 +73,32 @@ pyclipper:
     Used to perform polygons clipping, which is now used in zoomed regions. If
     not installed the program will print a warning message, and clipped
     polygons will just disappear.
+    pyclipper may be built with the ``use_int32`` macro, which makes polygons
+    booleans faster but limits coordinates to 32767 (0x7FFF): such a build is
+    detected at runtime, and coordinates are then scaled down to fit this
+    range.
 '''
 
+_pyclipper_failed = False
+_pyclipper_max_coord = 0  # 0: not tested yet
+
+
+def pyclipper_max_coord(pyclipper):
+    ''' Maximum integer coordinate accepted by the installed pyclipper build:
+    32767 for a build using the ``use_int32`` macro, None (no practical
+    limit) for the standard 64 bit build.
+    '''
+    global _pyclipper_max_coord
+    if _pyclipper_max_coord == 0:
+        pc = pyclipper.Pyclipper()
+        try:
+            pc.AddPath([[0, 0], [40000, 0], [0, 40000]],
+                       pyclipper.PT_SUBJECT, True)
+            _pyclipper_max_coord = None
+        except Exception:
+            _pyclipper_max_coord = 0x7fff
+    return _pyclipper_max_coord
+
 
 if fake_aims:
     # implement an "aims-lite": basic Aims mesh structures mimicing part of
@@ -141,6 +185,170 @@ if fake_aims:
             return aims._AimsTimeSurface(dim)
 
 
+@functools.lru_cache(maxsize=4096)
+def _parse_transform_2d(trans_str):
+    ''' Parse a 2D SVG transform string into a single 3x3 matrix, composed
+    once for all its successive functions. Many elements share the same
+    transform strings, thus results are cached, and returned read-only.
+
+    Returns None if the string contains anything else than plain 2D
+    functions (the full parser in SvgToMesh._get_transform then handles it).
+    '''
+    tr_list = trans_str.split(') ')
+    tr_list = [x + ')' for x in tr_list[:-1]] + [tr_list[-1]]
+    tmat = np.eye(3)
+    for trans_strx in tr_list:
+        i = trans_strx.find('(')
+        if i <= 0 or trans_strx[-1] != ')':
+            return None
+        ttype = trans_strx[:i]
+        try:
+            tdef = [float(x) for x in
+                    trans_strx[i+1:-1].replace(',', ' ').split()]
+        except ValueError:
+            return None
+        mat = np.eye(3)
+        if ttype == 'matrix' and len(tdef) == 6:
+            mat[:2, :] = np.reshape(tdef, (3, 2)).T
+        elif ttype == 'translate' and 1 <= len(tdef) <= 2:
+            mat[:len(tdef), 2] = tdef
+        elif ttype == 'scale' and 1 <= len(tdef) <= 2:
+            mat[0, 0] = tdef[0]
+            mat[1, 1] = tdef[-1]
+        elif ttype == 'rotate' and len(tdef) in (1, 3):
+            ca = np.cos(tdef[0] / 180. * np.pi)
+            sa = np.sin(tdef[0] / 180. * np.pi)
+            mat[:2, :2] = ((ca, -sa), (sa, ca))
+            if len(tdef) == 3:
+                mat[:2, 2] = (tdef[1] - ca * tdef[1] + sa * tdef[2],
+                              tdef[2] - sa * tdef[1] - ca * tdef[2])
+        elif ttype == 'skewX' and len(tdef) == 1:
+            mat[0, 1] = np.tan(tdef[0] / 180. * np.pi)
+        elif ttype == 'skewY' and len(tdef) == 1:
+            mat[1, 0] = np.tan(tdef[0] / 180. * np.pi)
+        else:
+            return None
+        tmat = tmat.dot(mat)
+    tmat = np.matrix(tmat)
+    tmat.flags.writeable = False
+    return tmat
+
+
+@functools.lru_cache(maxsize=256)
+def tag_name(tag):
+    ''' XML tag name without its namespace ("{ns}path" -> "path")
+    '''
+    return tag.rsplit('}', 1)[-1]
+
+
+def transform_point_2d(trans, x, y):
+    ''' Apply a 3x3 2D affine transform (matrix or array) to a single point,
+    using plain float arithmetic rather than a matrix product on a temporary
+    column matrix. Returns a (x, y) tuple of floats.
+    '''
+    (a, b, c), (d, e, f) = np.asarray(trans)[:2].tolist()
+    return (a * x + b * y + c, d * x + e * y + f)
+
+
+# elements read as meshes by SvgToMesh.read_paths()
+_shape_tags = frozenset(('path', 'rect', 'polygon', 'circle', 'ellipse'))
+
+
+# path "d" tokens: command letters, numbers, or anything else (unknown)
+_path_token_re = re.compile(
+    r'([MmLlHhVvCcSsQqTtAaZz])'
+    r'|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+    r'|([^\s,])')
+# number of arguments of each path command
+_path_cmd_nargs = {'m': 2, 'l': 2, 't': 2, 'h': 1, 'v': 1, 'c': 6, 's': 4,
+                   'q': 4, 'a': 7}
+
+
+def _parse_path_d(pdesc, path_id=None):
+    ''' Parse a SVG path "d" description into polyline vertices and segments.
+
+    The string is tokenized in one regex pass, then the arguments of each
+    command (including its implicit repetitions) are converted and
+    accumulated as a whole in numpy. Curves and arcs are not interpolated:
+    only their end points are kept.
+
+    Returns
+    -------
+    vert: numpy array (n, 3)
+    poly: numpy array (p, 2)
+    '''
+    vert = []
+    poly = []
+    nv = 0
+    pos = np.zeros(2)
+    first = 0
+    first_pos = pos
+    cmd = 'M'
+    args = []
+
+    def flush():
+        nonlocal nv, pos, first, first_pos, cmd
+        nargs = _path_cmd_nargs[cmd.lower()]
+        nseg = len(args) // nargs
+        if nseg * nargs != len(args):
+            print('incomplete path command', cmd, 'in path', path_id)
+        del args[nseg * nargs:]
+        if nseg == 0:
+            return
+        coords = np.array(args, dtype=float).reshape(nseg, nargs)
+        del args[:]
+        rel = cmd.islower()
+        pts = np.zeros((nseg, 2))
+        if cmd in 'hH':
+            pts[:, 0] = coords[:, 0]
+            if not rel:
+                pts[:, 1] = pos[1]
+        elif cmd in 'vV':
+            pts[:, 1] = coords[:, 0]
+            if not rel:
+                pts[:, 0] = pos[0]
+        else:
+            pts[:] = coords[:, -2:]
+        if rel:
+            pts = np.cumsum(pts, axis=0) + pos
+        seg = np.arange(nv, nv + nseg)
+        if cmd in 'mM':
+            first = nv
+            first_pos = pts[0]
+            seg = seg[1:]
+            # subsequent pairs are implicit lineto commands
+            cmd = 'l' if rel else 'L'
+        elif nv == 0:
+            seg = seg[1:]
+        vert.append(pts)
+        poly.append(np.array((seg - 1, seg)).T)
+        nv += nseg
+        pos = pts[-1]
+
+    for c, num, other in _path_token_re.findall(pdesc):
+        if num:
+            args.append(num)
+            continue
+        flush()
+        if c in ('z', 'Z'):
+            if nv >= first + 3:
+                poly.append(np.array(((nv - 1, first), )))
+            pos = first_pos
+        elif c:
+            cmd = c
+        else:
+            print('unknown command:', other, 'in path', path_id)
+    flush()
+
+    if vert:
+        vert = np.hstack((np.vstack(vert), np.zeros((nv, 1))))
+        poly = np.vstack(poly).astype(np.uint32)
+    else:
+        vert = np.zeros((0, 3))
+        poly = np.zeros((0, 2), dtype=np.uint32)
+    return vert, poly
+
+
 class SvgToMesh(object):
     ''' Read SVG, transforms things into meshes
     '''
@@ -173,6 +381,8 @@ class SvgToMesh(object):
             'geodesic_z': self.make_texcoord_geodesic_z,
         }
         self.enable_texturing = False
+        # last clip polygon converted for clip_path()
+        self._clip_path_cache = None
 
     @staticmethod
     def get_style(xml_elem):
@@ -256,7 +466,7 @@ class SvgToMesh(object):
                                  [1., 1., 1., 1.]])
         pts[2, :] = 0  # reset Z to 0
         mesh = aims.AimsTimeSurface_2()
-        mesh.vertex().assign(np.asarray(pts.T))
+        mesh.vertex().assign(np.asarray(pts.T, dtype=np.float32))
         mesh.polygon().assign([(0, 1), (1, 2), (2, 3), (3, 0)])
 
         trans3d = getattr(trans, 'transform_3d', None)
@@ -266,7 +476,7 @@ class SvgToMesh(object):
                                       dtype=np.float32)))
             vert = (trans3d * vert).T
             vert = vert[:, :3]
-            mesh.vertex().assign(np.asarray(vert))
+            mesh.vertex().assign(np.asarray(vert, dtype=np.float32))
             mesh.header()['transformation'] = list(np.ravel(trans3d))
 
         if material:
@@ -325,12 +535,12 @@ class SvgToMesh(object):
                                     [1., 1., 1., 1.]])
             pts[2, :] = 0  # reset Z to 0
             mesh = aims.AimsTimeSurface_2()
-            mesh.vertex().assign(np.asarray(pts.T))
+            mesh.vertex().assign(np.asarray(pts.T, dtype=np.float32))
             mesh.polygon().assign([(0, 1), (1, 2), (2, 3), (3, 0)])
 
         pts = trans * np.matrix(mesh.vertex().np.T)
         pts[2, :] = 0  # reset Z to 0
-        mesh.vertex().assign(np.asarray(pts.T))
+        mesh.vertex().assign(np.asarray(pts.T, dtype=np.float32))
 
         trans3d = getattr(trans, 'transform_3d', None)
         if trans3d is not None:
@@ -339,7 +549,7 @@ class SvgToMesh(object):
                                       dtype=np.float32)))
             vert = (trans3d * vert).T
             vert = vert[:, :3]
-            mesh.vertex().assign(np.asarray(vert))
+            mesh.vertex().assign(np.asarray(vert, dtype=np.float32))
             mesh.header()['transformation'] = list(np.ravel(trans3d))
 
         if material:
@@ -370,7 +580,7 @@ class SvgToMesh(object):
         pts = trans * points3
         pts[2, :] = 0  # reset Z to 0
         mesh = aims.AimsTimeSurface_2()
-        mesh.vertex().assign(np.asarray(pts.T))
+        mesh.vertex().assign(np.asarray(pts.T, dtype=np.float32))
 
         trans3d = getattr(trans, 'transform_3d', None)
         if trans3d is not None:
@@ -379,7 +589,7 @@ class SvgToMesh(object):
                                       dtype=np.float32)))
             vert = (trans3d * vert).T
             vert = vert[:, :3]
-            mesh.vertex().assign(np.asarray(vert))
+            mesh.vertex().assign(np.asarray(vert, dtype=np.float32))
             mesh.header()['transformation'] = list(np.ravel(trans3d))
 
         poly = [(i, i+1) for i in range(pts.shape[1] - 1)]
@@ -393,34 +603,16 @@ class SvgToMesh(object):
         ''' Read a path element as mesh, apply coords transformations
         '''
 
-        def read_point(pdesc, i, pt=None, nvert=None, npoly=None):
-            j = i + 1
-            try:
-                while j < n and pdesc[j] in '0123456789.e-':
-                    j += 1
-                x = float(pdesc[i:j])
-                i = j + 1
-                while i < len(pdesc) and pdesc[i] in ' ,':
-                    i += 1
-            except Exception as e:
-                print(e)
-                print('failed reading', pt, ', i:', i, ', vertices:', nvert,
-                      ', poly:', npoly)
-                raise
-            return x, i
-
         if not aims:
             raise RuntimeError('aims module is not available. read_path() '
                                'needs it.')
 
-        if xml_path.tag == 'rect' or xml_path.tag.endswith('}rect') or \
-                xml_path.tag.endswith('}image'):
+        tag = tag_name(xml_path.tag)
+        if tag == 'rect' or tag == 'image':
             return self.read_rect(xml_path, trans, style)
-        if xml_path.tag == 'polygon' or xml_path.tag.endswith('}polygon'):
+        if tag == 'polygon':
             return self.read_polygon(xml_path, trans, style)
-        if xml_path.tag == 'circle' or xml_path.tag.endswith('}circle'):
-            return self.read_circle(xml_path, trans, style)
-        if xml_path.tag == 'ellipse' or xml_path.tag.endswith('}ellipse'):
+        if tag == 'circle' or tag == 'ellipse':
             return self.read_circle(xml_path, trans, style)
 
         # read path
@@ -434,87 +626,7 @@ class SvgToMesh(object):
         if color[1]:
             material['border_color'] = color[1]
 
-        vert = []
-        poly = []
-        pdesc = xml_path.get('d')
-        n = len(pdesc)
-        i = 0
-        first = 0
-        cmd = 'M'
-        x = 0
-        y = 0
-
-        while i < n:
-            while(i < n and pdesc[i] == ' '):
-                i += 1
-            if i == n:
-                # print('end of path in:', pdesc)
-                break
-            # print('i:', i)
-            last_x, last_y = x, y
-            if pdesc[i] in 'mMcClLhHvVsSqQtTaA':
-                cmd = pdesc[i]
-                # print('cmd:', cmd)
-                i += 1
-                while pdesc[i] == ' ':
-                    i += 1
-            elif pdesc[i] in '-0123456789.':
-                if cmd not in 'vV':
-                    x, i = read_point(pdesc, i, 'x', len(vert), len(poly))
-                    if cmd >= 'a':
-                        x += last_x
-                if cmd not in 'hH':
-                    y, i = read_point(pdesc, i, 'y', len(vert), len(poly))
-                    if cmd >= 'a':
-                        y += last_y
-                # print(x,', ', y)
-                if cmd in 'cC':
-                    x, i = read_point(pdesc, i, 'x2', len(vert), len(poly))
-                    y, i = read_point(pdesc, i, 'y2', len(vert), len(poly))
-                    if cmd >= 'a':
-                        x += last_x
-                        y += last_y
-                    x, i = read_point(pdesc, i, 'x3', len(vert), len(poly))
-                    y, i = read_point(pdesc, i, 'y3', len(vert), len(poly))
-                    if cmd >= 'a':
-                        x += last_x
-                        y += last_y
-                elif cmd in 'sSqQ':
-                    x, i = read_point(pdesc, i, 'x2', len(vert), len(poly))
-                    y, i = read_point(pdesc, i, 'y2', len(vert), len(poly))
-                    if cmd >= 'a':
-                        x += last_x
-                        y += last_y
-                if cmd in 'aA':
-                    x, i = read_point(pdesc, i, 'x-axis-rotation',
-                                      len(vert), len(poly))
-                    y, i = read_point(pdesc, i, 'large-arc-flag',
-                                      len(vert), len(poly))
-                    y, i = read_point(pdesc, i, 'sweep-flag',
-                                      len(vert), len(poly))
-                    x, i = read_point(pdesc, i, 'x2', len(vert), len(poly))
-                    y, i = read_point(pdesc, i, 'y2', len(vert), len(poly))
-                    if cmd >= 'a':
-                        x += last_x
-                        y += last_y
-                vert.append((x, y, 0.))
-                if len(vert) > 1 and cmd not in 'mM':
-                    poly.append((len(vert) - 2, len(vert) - 1))
-                if cmd == 'm':
-                    cmd = 'l'
-                    first = len(vert) - 1
-                elif cmd == 'M':
-                    cmd = 'L'
-                    first = len(vert) - 1
-            elif pdesc[i] in 'zZ':
-                # print('close')
-                if len(vert) >= first + 3:
-                    poly.append((len(vert) - 1, first))
-                x, y = vert[first][:2]
-                i += 1
-            else:
-                print('unknown command:', pdesc[i], 'at position', i)
-                i += 1
+        vert, poly = _parse_path_d(xml_path.get('d'), xml_path.get('id'))
 
         mesh = aims.AimsTimeSurface(2)
         # print('vert:', vert)
@@ -524,10 +636,10 @@ class SvgToMesh(object):
             # print('trans:', trans)
             vert = np.asarray(vert).T
             vert[2, :] = 1.
-            vert = (trans * vert).T
+            vert = np.asarray(trans).dot(vert).T
             vert[:, 2] = 0.
             # print('to: vert:', vert)
-        mesh.vertex().assign(np.asarray(vert))
+        mesh.vertex().assign(np.asarray(vert, dtype=np.float32))
         mesh.polygon().assign(poly)
         trans3d = getattr(trans, 'transform_3d', None)
         if trans3d is not None:
@@ -535,7 +647,7 @@ class SvgToMesh(object):
                               np.ones((1, len(vert)), dtype=np.float32)))
             vert = (trans3d * vert).T
             vert = vert[:, :3]
-            mesh.vertex().assign(np.asarray(vert))
+            mesh.vertex().assign(np.asarray(vert, dtype=np.float32))
             mesh.header()['transformation'] = list(np.ravel(trans3d))
 
         if material:
@@ -562,7 +674,7 @@ class SvgToMesh(object):
                 if texture is not None:
                     found = True
                     try:
-                        tex_def = json.loads(texture)
+                        tex_def = json_loads(texture)
                     except Exception:
                         print(
                             'error in JSON decoding of %s property of '
@@ -615,7 +727,7 @@ class SvgToMesh(object):
         image = aims.Volume_RGBA()
         gltf_props = xml_element.get('gltf_properties')
         if gltf_props is not None:
-            gltf_props = json.loads(gltf_props)
+            gltf_props = json_loads(gltf_props)
         if uri[:6] == 'data:':
             # bin
             pass
@@ -699,7 +811,7 @@ class SvgToMesh(object):
             vert = mesh.vertex(t).np.T[:2, :]
             vert = np.vstack((vert, np.ones((1, vert.shape[1]))))
             trans_c = ptrans.dot(vert)[:2, :].T
-            tx.assign(np.asarray(trans_c))
+            tx.assign(np.asarray(trans_c, dtype=np.float32))
         return tex
 
     def make_texcoord_geodesic_z(self, mesh, tex_def):
@@ -849,6 +961,14 @@ class SvgToMesh(object):
             else:
                 return np.matrix(np.eye(3))
 
+        if not as_3d:
+            # fast path: one cached matrix for the whole string
+            mat = _parse_transform_2d(trans_str)
+            if mat is not None:
+                if previous is None:
+                    return np.matrix(mat, copy=True)
+                return previous * mat
+
         tr_list = trans_str.split(') ')
         tr_list = [x + ')' for x in tr_list[:-1]] + [tr_list[-1]]
         tmat = previous
@@ -994,10 +1114,10 @@ class SvgToMesh(object):
         bbox = [None, None]
         bmin, bmax = bbox
         while todo:
-            element, trans = todo.pop(0)
+            element, trans = todo.pop()
             trans = self.get_transform(element, trans, no_3d=True)
             if element.tag.endswith('}g'):
-                todo = [(c, trans) for c in element] + todo
+                todo += [(c, trans) for c in reversed(element[:])]
             else:
                 if element.tag.endswith('}path') \
                         or element.tag.endswith('}rect') \
@@ -1007,20 +1127,19 @@ class SvgToMesh(object):
                     if trans is None:
                         trans = np.matrix(np.eye(3))
                     mesh = self.read_path(element, trans)
-                    for v in mesh.vertex():
+                    vert = np.asarray(mesh.vertex().np)
+                    if len(vert) != 0:
+                        vmin = vert[:, :2].min(axis=0).tolist()
+                        vmax = vert[:, :2].max(axis=0).tolist()
                         if bmin is None:
-                            bmin = [v[0], v[1]]
-                            bmax = [v[0], v[1]]
+                            bmin = vmin
+                            bmax = vmax
                             bbox = [bmin, bmax]
                         else:
-                            if v[0] < bmin[0]:
-                                bmin[0] = v[0]
-                            if v[0] > bmax[0]:
-                                bmax[0] = v[0]
-                            if v[1] < bmin[1]:
-                                bmin[1] = v[1]
-                            if v[1] > bmax[1]:
-                                bmax[1] = v[1]
+                            bmin[0] = min(bmin[0], vmin[0])
+                            bmin[1] = min(bmin[1], vmin[1])
+                            bmax[0] = max(bmax[0], vmax[0])
+                            bmax[1] = max(bmax[1], vmax[1])
                     if not exhaustive:
                         break
         return bbox
@@ -1034,7 +1153,7 @@ class SvgToMesh(object):
             otrans = in_trans
         todo = [(xml, in_trans, otrans)]
         while todo:
-            element, c_trans, c_otrans = todo.pop(0)
+            element, c_trans, c_otrans = todo.pop()
             transm = self.get_transform(element)
             if c_trans is None:
                 c_trans = transm
@@ -1050,7 +1169,7 @@ class SvgToMesh(object):
                     c_otrans.transform_3d = transm.transform_3d
                 # element.set('transform', None) # FIXME: how to remove it
             if element.tag.endswith('}g'):
-                todo = [(c, c_trans, c_otrans) for c in element] + todo
+                todo += [(c, c_trans, c_otrans) for c in reversed(element[:])]
             else:
                 if element.tag.endswith('}path'):
                     iotrans = np.matrix(scipy.linalg.inv(c_otrans))
@@ -1343,13 +1462,14 @@ class SvgToMesh(object):
             raise RuntimeError('aims module is not available. read_paths() '
                                'needs it.')
         trans = np.matrix(np.eye(3))
+        # depth-first traversal stack: the next item is at the end
         todo = [(xml_et.getroot(), trans, None, [])]
         self.mesh = aims.AimsTimeSurface(2)
         self.mesh_list = []
         self.mesh_dict = {}
         index = 0
         while todo:
-            child, trans, main_group, parents = todo.pop(0)
+            child, trans, main_group, parents = todo.pop()
             if child is None:
                 # this is a hacked special code to call cleaner
                 cleaners = trans
@@ -1381,23 +1501,19 @@ class SvgToMesh(object):
                 reader(child, trans, style)
             if cleaner not in (None, [], ()):
                 # insert a special code to do something at the end of this tree
-                todo.insert(0, (None, cleaner, None, parents))
+                todo.append((None, cleaner, None, parents))
             if reader is None and style and style.get('display') == 'none' \
                     and child.get('{http://www.inkscape.org/namespaces/inkscape}label') \
                         not in self.explicitly_show:
                 # hidden layer, skip it
                 continue
+            tag = tag_name(child.tag)
             if reader is not None:
                 pass
-            elif child.tag.endswith('}defs') or child.tag == 'defs':
+            elif tag == 'defs':
                 # skip defs sub-tree
                 continue
-            elif child.tag in ('path', 'rect', 'polygon', 'circle') \
-                    or child.tag.endswith('}path') \
-                    or child.tag.endswith('}rect') \
-                    or child.tag.endswith('}polygon') \
-                    or child.tag.endswith('}circle') \
-                    or child.tag.endswith('}ellipse'):
+            elif tag in _shape_tags:
                 child_mesh = self.read_path(child, trans, style)
                 if self.concat_mesh == 'merge':
                     aims.SurfaceManip.meshMerge(self.mesh, child_mesh)
@@ -1438,11 +1554,11 @@ class SvgToMesh(object):
                 else:
                     self.mesh_list.append(child_mesh)
                     self.get_textures(self.mesh, child, parents)
-            elif child.tag.endswith('}clipPath') or child.tag == 'clipPath':
+            elif tag == 'clipPath':
                 # print('clipPath')
                 # skip clipPaths
                 pass
-            elif child.tag.endswith('}text') or child.tag == 'text':
+            elif tag == 'text':
                 tgroup = self.main_group
                 if not tgroup.endswith('_text'):
                     tgroup += '_text'
@@ -1459,7 +1575,7 @@ class SvgToMesh(object):
                 current_text_o['properties']['size'] = size
                 current_text_o['objects'][0]['properties']['position'] \
                     = [-size[0]/2., size[1]/2., 0]
-            elif child.tag.endswith('}tspan') or child.tag == 'tspan':
+            elif tag == 'tspan':
                 text = child.text
                 tgroup = self.main_group
                 if not tgroup.endswith('_text'):
@@ -1490,21 +1606,23 @@ class SvgToMesh(object):
                 current_text_o['objects'][0]['properties']['position'] \
                     = [-size[0]/2., size[1]/2., 0]
             elif self.main_group is None \
-                    and (child.tag.endswith('}g') or child.tag == 'g'):
+                    and tag == 'g':
                 self.main_group = child.get('id')
             if not skip_children and len(child) != 0:
                 # set the metadata layer, if present, first, because it may
                 # contain information used by other items
                 meta = []
                 other = []
+                c_parents = parents + [child]
                 for c in child:
-                    if c.tag.endswith('}metadata'):
-                        meta.append((c, trans, self.main_group,
-                                     parents + [child]))
+                    if tag_name(c.tag) == 'metadata':
+                        meta.append((c, trans, self.main_group, c_parents))
                     else:
-                        other.append((c, trans, self.main_group,
-                                      parents + [child]))
-                todo = meta + other + todo
+                        other.append((c, trans, self.main_group, c_parents))
+                # pushed in reverse order so that they are popped in document
+                # order
+                todo += reversed(other)
+                todo += reversed(meta)
 
         if self.concat_mesh in ('merge', 'time'):
             return self.mesh
@@ -1648,16 +1766,29 @@ class SvgToMesh(object):
         poly = walls.polygon()
 
         vert.assign(vert0 + up.vertex())
-        nv = len(vert0)
-
-        for line in poly0:
-            poly.append((line[0], line[1], nv + line[0]))
-            poly.append((line[1], nv + line[1], nv + line[0]))
+        poly.assign(SvgToMesh.wall_triangles(poly0, len(vert0)))
 
         walls.updateNormals()
 
         return up, walls
 
+    @staticmethod
+    def wall_triangles(lines, nv):
+        ''' Triangles joining a segments mesh polygons (lines) to their
+        extruded copy, whose vertices are shifted by nv: two triangles per
+        segment, as a (2 * nlines, 3) array.
+        '''
+        lines = np.asarray(lines.np if hasattr(lines, 'np') else lines,
+                           dtype=np.uint32).reshape((-1, 2))
+        tri = np.empty((len(lines) * 2, 3), dtype=np.uint32)
+        tri[0::2, 0] = lines[:, 0]
+        tri[0::2, 1] = lines[:, 1]
+        tri[0::2, 2] = lines[:, 0] + nv
+        tri[1::2, 0] = lines[:, 1]
+        tri[1::2, 1] = lines[:, 1] + nv
+        tri[1::2, 2] = lines[:, 0] + nv
+        return tri
+
     @staticmethod
     def prune_empty_groups(xml):
         todo = [(xml.getroot(), None, True)]
@@ -1665,7 +1796,7 @@ class SvgToMesh(object):
         total = 0
 
         while todo:
-            element, parent, begin = todo.pop(0)
+            element, parent, begin = todo.pop()
             total += 1
             if element.tag.endswith('}g'):
                 if len(element) == 0:
@@ -1677,14 +1808,14 @@ class SvgToMesh(object):
                 added = [(child, element, True) for child in element]
                 if parent is not None:
                     added.append((element, parent, False))
-                todo = added + todo
+                todo += reversed(added)
         print('pruned', count, 'elements out of', total)
 
     def copy_svg(self, xml):
         xml2 = copy.deepcopy(xml)
         todo = [xml2]
         while todo:
-            item = todo.pop(0)
+            item = todo.pop()
             eid = item.get('id')
             if eid is None:
                 eid = 'copy'
@@ -1696,7 +1827,7 @@ class SvgToMesh(object):
             self.id_count += 1
             item.set('id', eid)
             if item.tag == 'g' or item.tag.endswith('}g'):
-                todo = item[:] + todo
+                todo += reversed(item[:])
         return xml2
 
     def copy_item_properties(self, source, dest):
@@ -1731,7 +1862,7 @@ class SvgToMesh(object):
         # print('replace_dict:', replace_dict)
 
         while todo:
-            element, trans, parent, current_id, current_label = todo.pop(0)
+            element, trans, parent, current_id, current_label = todo.pop()
             element2 = self.replace_filter_element(element)
             if element2 is None:
                 parent.remove(element)
@@ -1785,7 +1916,7 @@ class SvgToMesh(object):
 
                     added = [(child, trans, element, current_id, current_label)
                              for child in element]
-                    todo = added + todo
+                    todo += reversed(added)
                 else:
                     bbox = self.boundingbox(element, trans)
                     ecent = ((bbox[0][0] + bbox[1][0]) / 2,
@@ -1808,7 +1939,7 @@ class SvgToMesh(object):
             else:
                 added = [(child, trans, element, current_id, current_label)
                          for child in element]
-                todo = added + todo
+                todo += reversed(added)
 
     def cut_segment(self, v1, v2, bmin, bmax):
         if v1[0] < bmin[0]:
@@ -1917,7 +2048,9 @@ class SvgToMesh(object):
         if pc_mesh:
             return pc_mesh
 
-        vert = mesh.vertex()
+        # scale and convert all vertices at once
+        vert = (np.asarray(mesh.vertex().np)[:, :2] * scale).astype(
+            int).tolist()
         poly = mesh.polygon()
         paths = []
         path = []
@@ -1926,8 +2059,8 @@ class SvgToMesh(object):
         prev = None
 
         for i, p in enumerate(poly):
-            v1 = [int(x) for x in vert[p[0]] * scale][:2]
-            v2 = [int(x) for x in vert[p[1]] * scale][:2]
+            v1 = vert[p[0]]
+            v2 = vert[p[1]]
             if first is None or prev != p[0]:
                 if first is not None:
                     paths.append(path)
@@ -1971,7 +2104,8 @@ class SvgToMesh(object):
             vert[2, :] = 1.
             vert = (itrans * vert).T
             vert[:, 2] = 0.
-        mesh.vertex().assign(vert)
+        mesh.vertex().assign(
+            np.asarray(vert, dtype=np.float32).reshape((-1, 3)))
         mesh.polygon().assign(poly)
         return mesh
 
@@ -2047,18 +2181,47 @@ class SvgToMesh(object):
                 print('python -m pip install pyclipper', file=sys.stderr)
                 print('For the time being, some objects will disappear from '
                       'clipped zoomed regions.')
-                return None
+            return None
 
         mesh = self.read_path(xml_path, trans)
         if len(mesh.polygon()) == 0:
             return None
-        if isinstance(clip_poly, aims.AimsTimeSurface_2):
-            clip_mesh = clip_poly
-        else:
-            clip_mesh = self.read_path(clip_poly, clip_trans)
-        clip, _ = self.mesh_to_pyclipper(clip_mesh)
-        subj, closed = self.mesh_to_pyclipper(mesh)
-        del mesh, clip_mesh
+        # the same clip polygon is generally used for many paths in a row:
+        # convert it only once (for a given scale)
+        clip_cache = self._clip_path_cache
+        if clip_cache is None or clip_cache[0] is not clip_poly \
+                or clip_cache[1] is not clip_trans:
+            if isinstance(clip_poly, aims.AimsTimeSurface_2):
+                clip_mesh = clip_poly
+            else:
+                clip_mesh = self.read_path(clip_poly, clip_trans)
+            scale = 1000.
+            max_coord = pyclipper_max_coord(pyclipper)
+            if max_coord is not None:
+                # int32 pyclipper build: coordinates have to fit in its
+                # range. The scale is set from the clip polygon extent.
+                extent = float(np.max(np.abs(
+                    np.asarray(clip_mesh.vertex().np)[:, :2])))
+                if extent * scale >= max_coord:
+                    scale = max_coord / (extent * 1.001)
+            clip_cache = (clip_poly, clip_trans, clip_mesh, scale, max_coord,
+                          {})
+            self._clip_path_cache = clip_cache
+        clip_mesh, scale, max_coord, clip_paths = clip_cache[2:]
+        if max_coord is not None:
+            # paths larger than the clip polygon: halve the scale until they
+            # fit, so that only a few scales (and converted clip paths) are
+            # ever used for a clip polygon
+            extent = float(np.max(np.abs(
+                np.asarray(mesh.vertex().np)[:, :2])))
+            while extent * scale >= max_coord:
+                scale /= 2
+        clip = clip_paths.get(scale)
+        if clip is None:
+            clip, _ = self.mesh_to_pyclipper(clip_mesh, scale=scale)
+            clip_paths[scale] = clip
+        subj, closed = self.mesh_to_pyclipper(mesh, scale=scale)
+        del mesh
         pc = pyclipper.Pyclipper()
         # print('clip:', clip)
         pc.AddPath(clip[0], pyclipper.PT_CLIP, True)
@@ -2069,7 +2232,7 @@ class SvgToMesh(object):
         itrans = None
         if trans is not None:
             itrans = np.linalg.inv(trans)
-        cmesh = self.pyclipper_to_mesh(clipped, itrans=itrans)
+        cmesh = self.pyclipper_to_mesh(clipped, scale=scale, itrans=itrans)
         del clipped
         style = self.get_style(xml_path)
         clipped_xml = self.mesh_to_path(cmesh, style)
@@ -2311,7 +2474,14 @@ class SvgToMesh(object):
 
     def read_xml(self, svg_filename):
         self.svg_filename = svg_filename
-        self.svg = ET.parse(svg_filename)
+        if xml_parser is not None:
+            # lxml reads the file by itself, in C
+            self.svg = ET.parse(svg_filename, parser=xml_parser)
+        else:
+            # ElementTree feeds its parser with small reads: use a large
+            # buffer to avoid many system calls on multi-MB maps
+            with open(svg_filename, 'rb', buffering=1 << 20) as f:
+                self.svg = ET.parse(f)
         return self.svg
 
 
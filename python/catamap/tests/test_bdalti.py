@@ -0,0 +1,91 @@
+# coding: UTF-8
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from catamap.altitude import bdalti
+
+
+class _MapImage(object):
+    ''' Minimal stand-in for an aims altitude map volume
+    '''
+
+    def __init__(self, data, nodata):
+        self.data = np.asarray(data, dtype=np.float32)[:, :, np.newaxis,
+                                                       np.newaxis]
+        self._header = {'NODATA_value': nodata}
+
+    def getSizeX(self):
+        return self.data.shape[0]
+
+    def getSizeY(self):
+        return self.data.shape[1]
+
+    def header(self):
+        return self._header
+
+    def at(self, x, y):
+        return self.data[x, y, 0, 0]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data
+
+
+class TestGetZ(unittest.TestCase):
+
+    nodata = -9999.
+
+    def setUp(self):
+        # 2 x 2 tiles of 10 x 10 m, with negative coords. The last tile is
+        # missing.
+        rng = np.random.default_rng(0)
+        self.images = {}
+        table = [[None, None], [None, None]]
+        for yi in range(2):
+            for xi in range(2):
+                if xi == 1 and yi == 1:
+                    continue
+                data = rng.uniform(0., 100., size=(4, 5))
+                data[0, 0] = self.nodata
+                fname = 'tile_%d_%d.ima' % (xi, yi)
+                self.images[fname] = _MapImage(data, self.nodata)
+                table[yi][xi] = {'file': fname}
+        self.meta_map = {
+            'xllcorners': [-20., -10.],
+            'yllcorners': [-10., 0.],
+            'cellsize': 10.,
+            'table': table,
+        }
+
+    def load_image(self, base, fname):
+        return self.images[fname]
+
+    def test_get_z_batch(self):
+        rng = np.random.default_rng(1)
+        # random points, including outside the map
+        xs = list(rng.uniform(-25., 5., size=196))
+        ys = list(rng.uniform(-15., 15., size=196))
+        # tiles and pixels borders, map limits
+        for x in (-20., -17.5, -10., -7.5, 0., -20.000001, -0.000001):
+            for y in (-10., -8., 0., 2., 10., -10.000001, 9.999999):
+                xs.append(x)
+                ys.append(y)
+        xs = np.array(xs)
+        ys = np.array(ys)
+        with mock.patch.object(bdalti, '_load_map_image', self.load_image):
+            z = [bdalti.get_z(x, y, self.meta_map, 'base')
+                 for x, y in zip(xs, ys)]
+            zb = bdalti.get_z_batch(xs.reshape(-1, 7), ys.reshape(-1, 7),
+                                    self.meta_map, 'base')
+        self.assertEqual(zb.shape, (len(xs) // 7, 7))
+        np.testing.assert_array_equal(zb.ravel(),
+                                      np.array(z, dtype=np.float32))
+        # all cases are actually tested
+        self.assertIn(-99999., z)
+        self.assertTrue(np.any(zb.ravel() != -99999.))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+# coding: UTF-8
+
+import os.path as osp
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from catamap import map_to_meshes
+
+
+svg_map = '''<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="100" height="100" viewBox="0 0 100 100">
+  <defs id="defs1"/>
+  <g inkscape:groupmode="layer" inkscape:label="galeries" id="layer1"
+     style="display:inline">
+    <path id="path1" d="M 10,10 L 90,10 L 90,90 Z"
+          style="fill:#ff0000;stroke:#000000"/>
+  </g>
+  <g inkscape:groupmode="layer" inkscape:label="clip" id="layer2"
+     style="display:inline">
+    <rect id="clip_rect" x="0" y="0" width="100" height="100"
+          style="fill:none"/>
+  </g>
+</svg>
+'''
+
+
+class TestBuild2DMap(unittest.TestCase):
+    ''' Smoke tests for 2D maps building, on a tiny map. Inkscape exports are
+    not run.
+    '''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='catamap_test_')
+        self.svg_file = osp.join(self.tmpdir, 'map.svg')
+        with open(self.svg_file, 'w') as f:
+            f.write(svg_map)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_filters_results(self):
+        svg2d = map_to_meshes.CataMapTo2DMap()
+        xml = svg2d.read_xml(self.svg_file)
+        map2d = svg2d.build_2d_map(xml,
+                                   filters=['split_layers="default"'])
+        self.assertIsNotNone(map2d.getroot())
+        self.assertEqual(len(svg2d.results), 1)
+        self.assertNotEqual(len(svg2d.results[-1]), 0)
+
+    def test_build_2d_map(self):
+        svg2d = map_to_meshes.CataMapTo2DMap()
+        xml = svg2d.read_xml(self.svg_file)
+        out_filename = osp.join(self.tmpdir, 'out.svg')
+        with mock.patch.object(map_to_meshes, 'export_png') as export_png, \
+                mock.patch.object(map_to_meshes, 'inkscape_version',
+                                  return_value=[1, 2, 0]):
+            map_to_meshes.build_2d_map(xml, out_filename, 'test', [],
+                                       'clip_rect', 90, do_jpg=False)
+        out_svg = osp.join(self.tmpdir, 'out_test.svg')
+        export_png.assert_called_once_with(out_svg, 90, 'clip_rect',
+                                           shell=None)
+        self.assertTrue(osp.exists(out_svg))
+        self.assertFalse(osp.exists(
+            osp.join(self.tmpdir, 'out_test_flat.svg')))
+
+
+class _MeshArray(np.ndarray):
+    ''' numpy array with the ``np`` property of aims vectors
+    '''
+
+    @property
+    def np(self):
+        return self.view(np.ndarray)
+
+
+class _Region(object):
+    ''' Minimal stand-in for a 2D aims mesh (vertices and segments)
+    '''
+
+    def __init__(self, vertex, polygon):
+        self._vertex = np.asarray(vertex, dtype=float).view(_MeshArray)
+        self._polygon = np.asarray(polygon).view(_MeshArray)
+
+    def vertex(self):
+        return self._vertex
+
+    def polygon(self):
+        return self._polygon
+
+
+class TestPointsInRegion(unittest.TestCase):
+    ''' Results pinned against the former point by point in_region()
+    '''
+
+    # L-shaped (non-convex) clip polygon
+    region = _Region([(0, 0), (4, 0), (4, 1), (1, 1), (1, 4), (0, 4)],
+                     [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 0)])
+    bbox = ((0, 0), (4, 4))
+    # inside, concave part, borders and vertices, outside the bbox
+    points = [(0.5, 0.5), (2, 0.5), (2, 2), (0.5, 3), (4, 0.5), (0, 2),
+              (1, 2), (-1, 1), (5, 5), (3, 3), (0.5, 1), (3.9, 0.99),
+              (1.0000001, 2)]
+    inside = [True, True, False, True, True, True, True, False, False,
+              False, True, True, False]
+
+    def test_points_in_region(self):
+        for bbox in (self.bbox, None):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                inside = map_to_meshes.CataMapTo2DMap.points_in_region(
+                    self.points, self.region, bbox)
+            self.assertEqual(inside.tolist(), self.inside)
+
+    def test_bbox_only(self):
+        inside = map_to_meshes.CataMapTo2DMap.points_in_region(
+            self.points, None, self.bbox)
+        self.assertEqual(inside.tolist(),
+                         [True, True, True, True, True, True, True, False,
+                          False, True, True, True, True])
+
+    def test_in_region(self):
+        for point, inside in zip(self.points, self.inside):
+            self.assertIs(map_to_meshes.CataMapTo2DMap.in_region(
+                point, self.region, self.bbox), inside)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# coding: UTF-8
+
+import unittest
+
+import numpy as np
+
+from catamap.altitude import filt_intens
+
+
+class TestInterpolatePalette(unittest.TestCase):
+    ''' Altitudes pinned against the former color by color interpolation in
+    get_float_altitude()
+    '''
+
+    dst_scl = [(0, 0, 0), (10, 0, 0), (20, 0, 0), (20, 10, 0)]
+    src_scl = [0., 100., 200., 300.]
+    # palette colors, projections inside / outside segments, equal distances
+    # to two palette colors
+    colors = [(0, 0, 0), (5, 0, 0), (12, 3, 0), (-5, 0, 0), (20, 5, 0),
+              (25, 20, 0), (15, 0, 0), (3, 4, 0)]
+    altitudes = [0., 50., 120., 0., 250., 300., 150., 30.]
+
+    def test_interpolate_palette(self):
+        alt = filt_intens.interpolate_palette(self.colors, self.src_scl,
+                                              self.dst_scl)
+        np.testing.assert_allclose(alt, self.altitudes, atol=1e-5)
+        # any leading shape
+        alt = filt_intens.interpolate_palette(
+            np.reshape(self.colors, (2, 4, 3)), self.src_scl, self.dst_scl)
+        self.assertEqual(alt.shape, (2, 4))
+        np.testing.assert_allclose(alt.ravel(), self.altitudes, atol=1e-5)
+
+    def test_degenerate_palette(self):
+        # duplicate palette colors: last altitude
+        alt = filt_intens.interpolate_palette(
+            [(1, 0, 0), (5, 0, 0)], [0., 100., 200.],
+            [(0, 0, 0), (0, 0, 0), (10, 0, 0)])
+        self.assertEqual(alt.tolist(), [200., 200.])
+
+    @unittest.skipIf(filt_intens._interpolate_palette_kernel is None,
+                     'numba is not available')
+    def test_interpolate_palette_kernel(self):
+        alt = np.zeros(len(self.colors))
+        filt_intens._interpolate_palette_kernel(
+            np.asarray(self.colors, dtype=float),
+            np.asarray(self.src_scl, dtype=float),
+            np.asarray(self.dst_scl, dtype=float), alt)
+        np.testing.assert_allclose(alt, self.altitudes, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
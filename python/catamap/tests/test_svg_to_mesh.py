@@ -0,0 +1,104 @@
+# coding: UTF-8
+
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from catamap import svg_to_mesh
+
+
+path_xml = '<path xmlns="http://www.w3.org/2000/svg" id="%s" d="%s"/>'
+
+
+class TestClipPath(unittest.TestCase):
+
+    def test_clip_path_without_pyclipper(self):
+        svg = svg_to_mesh.SvgToMesh()
+        path = svg_to_mesh.ET.fromstring(
+            path_xml % ('path1', 'M -10,20 L 200,20 L 200,80 Z'))
+        clip = svg_to_mesh.ET.fromstring(
+            path_xml % ('clip', 'M 0,0 L 100,0 L 100,100 L 0,100 Z'))
+        trans = np.matrix(np.eye(3))
+        with mock.patch.dict(sys.modules, {'pyclipper': None}), \
+                mock.patch.object(svg_to_mesh, '_pyclipper_failed', False), \
+                mock.patch('sys.stderr'), mock.patch('sys.stdout'):
+            # the warning is only printed once, later paths are not
+            # clipped either
+            for i in range(2):
+                self.assertIsNone(svg.clip_path(path, trans, clip, trans))
+
+
+class TestParsePathD(unittest.TestCase):
+    ''' Vertices and segments pinned against the former SvgToMesh.read_path()
+    parser
+    '''
+
+    paths = [
+        ('M 10,20 L 30,40 L 50,20 Z',
+         [[10, 20], [30, 40], [50, 20]],
+         [[0, 1], [1, 2], [2, 0]]),
+        ('m 10,20 30,40 -20,10 h 5 v -5 z',
+         [[10, 20], [40, 60], [20, 70], [25, 70], [25, 65]],
+         [[0, 1], [1, 2], [2, 3], [3, 4], [4, 0]]),
+        ('M 0,0 C 1,1 2,2 3,3 S 4,4 5,5 Q 6,6 7,7 A 1 1 0 0 1 8,9 H 1 V 2',
+         [[0, 0], [3, 3], [5, 5], [7, 7], [8, 9], [1, 9], [1, 2]],
+         [[0, 1], [1, 2], [2, 3], [3, 4], [4, 5], [5, 6]]),
+        ('M 0,0 L 1,0 L 1,1 z m 2,0 l 1,0 l 0,1 z',
+         [[0, 0], [1, 0], [1, 1], [2, 0], [3, 0], [3, 1]],
+         [[0, 1], [1, 2], [2, 0], [3, 4], [4, 5], [5, 3]]),
+        ('M 1.5e1,-2.5 l 0.5,-0.5 0.5,0.5 z',
+         [[15, -2.5], [15.5, -3], [16, -2.5]],
+         [[0, 1], [1, 2], [2, 0]]),
+    ]
+
+    def test_parse_path_d(self):
+        for d, vert, poly in self.paths:
+            pvert, ppoly = svg_to_mesh._parse_path_d(d)
+            self.assertEqual(pvert.shape, (len(vert), 3), d)
+            self.assertTrue(np.all(pvert[:, 2] == 0), d)
+            self.assertEqual(pvert[:, :2].tolist(), vert, d)
+            self.assertEqual(ppoly.tolist(), poly, d)
+
+    def test_empty_path(self):
+        vert, poly = svg_to_mesh._parse_path_d('')
+        self.assertEqual(vert.shape, (0, 3))
+        self.assertEqual(poly.shape, (0, 2))
+
+
+class TestParseTransform2d(unittest.TestCase):
+    ''' Matrices pinned against the former SvgToMesh._get_transform() parser
+    '''
+
+    transforms = {
+        'translate(10,20)': [[1, 0, 10], [0, 1, 20], [0, 0, 1]],
+        'scale(2)': [[2, 0, 0], [0, 2, 0], [0, 0, 1]],
+        'scale(2,3)': [[2, 0, 0], [0, 3, 0], [0, 0, 1]],
+        'rotate(30)': [[0.866025403784, -0.5, 0], [0.5, 0.866025403784, 0],
+                       [0, 0, 1]],
+        'rotate(30,5,6)': [[0.866025403784, -0.5, 3.669872981078],
+                           [0.5, 0.866025403784, -1.696152422707],
+                           [0, 0, 1]],
+        'matrix(1,2,3,4,5,6)': [[1, 3, 5], [2, 4, 6], [0, 0, 1]],
+        'translate(1,2) scale(3)': [[3, 0, 1], [0, 3, 2], [0, 0, 1]],
+        'skewX(10)': [[1, 0.176326980708, 0], [0, 1, 0], [0, 0, 1]],
+        'skewY(10) translate(-4)': [[1, 0, -4],
+                                    [0.176326980708, 1, -0.705307922834],
+                                    [0, 0, 1]],
+    }
+
+    def test_parse_transform_2d(self):
+        for trans_str, mat in self.transforms.items():
+            tmat = svg_to_mesh._parse_transform_2d(trans_str)
+            self.assertIsNotNone(tmat, trans_str)
+            np.testing.assert_allclose(tmat, mat, atol=1e-11,
+                                       err_msg=trans_str)
+
+    def test_unsupported_transform(self):
+        self.assertIsNone(svg_to_mesh._parse_transform_2d('center4()'))
+        self.assertIsNone(svg_to_mesh._parse_transform_2d('rotate(1,2)'))
+
+
+if __name__ == '__main__':
+    unittest.main()